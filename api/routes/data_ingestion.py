@@ -355,8 +355,8 @@ def process_file(file_id):
             if db is None:
                 return APIResponse.server_error("Database connection failed")
             
-            # Find the file record
-            file_record = db.uploaded_files.find_one({'file_id': file_id})
+            # Find the file record (only its path is needed; file_id is uniquely indexed)
+            file_record = db.uploaded_files.find_one({'file_id': file_id}, {'_id': 0, 'file_path': 1})
             
             if not file_record:
                 return APIResponse.not_found("File")
@@ -415,8 +415,15 @@ def list_files():
             # Calculate skip
             skip = (page - 1) * per_page
             
-            # Get files with pagination
-            cursor = db.uploaded_files.find(filter_query).sort('upload_timestamp', -1).skip(skip).limit(per_page)
+            # Get files with pagination (only the fields listed below, not
+            # the full processing results and error logs)
+            projection = {
+                '_id': 0, 'file_id': 1, 'original_filename': 1, 'description': 1,
+                'file_size': 1, 'status': 1, 'upload_timestamp': 1, 'processed_timestamp': 1,
+                'metadata': 1, 'processing_results.success': 1,
+                'processing_results.schema_detected': 1, 'processing_results.confidence': 1
+            }
+            cursor = db.uploaded_files.find(filter_query, projection).sort('upload_timestamp', -1).skip(skip).limit(per_page)
             
             files_list = []
             for doc in cursor:
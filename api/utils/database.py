@@ -81,6 +81,7 @@ def init_databases():
                     db.taxonomy_data.create_index([('species_id', 1)], unique=True)
                     db.edna_sequences.create_index([('sequence_id', 1)], unique=True)
                     db.uploaded_files.create_index([('file_id', 1)], unique=True)
+                    db.uploaded_files.create_index([('status', 1), ('upload_timestamp', -1)])
                     logger.info("MongoDB indexes created successfully")
                 except Exception as e:
                     logger.warning(f"Failed to create MongoDB indexes: {e}")
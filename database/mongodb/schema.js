@@ -655,7 +655,9 @@ print("Creating indexes for uploaded_files collection...");
 
 // Uploaded Files Indexes
 db.uploaded_files.createIndex({ "file_id": 1 }, { unique: true, name: "idx_file_id_unique" });
-db.uploaded_files.createIndex({ "status": 1 }, { name: "idx_file_status" });
+// Serves the file listing (filter by status, newest uploads first) and,
+// as its prefix, plain status lookups
+db.uploaded_files.createIndex({ "status": 1, "upload_timestamp": -1 }, { name: "idx_file_status_upload_timestamp" });
 db.uploaded_files.createIndex({ "upload_timestamp": 1 }, { name: "idx_upload_timestamp" });
 db.uploaded_files.createIndex({ "processed_timestamp": 1 }, { name: "idx_processed_timestamp" });
 db.uploaded_files.createIndex({ "upload_info.uploader_id": 1 }, { name: "idx_uploader_id" });
@@ -65,6 +65,17 @@ CREATE INDEX IF NOT EXISTS idx_morphometric_specimen ON morphometric_data(specim
 CREATE INDEX IF NOT EXISTS idx_morphometric_timestamp ON morphometric_data(timestamp);
 CREATE INDEX IF NOT EXISTS idx_morphometric_metrics ON morphometric_data USING GIN(metrics);
 
+-- Taxonomy Cache Table
+-- Local copy of the MongoDB taxonomy names so cross-database reports can JOIN in SQL
+-- (refreshed by scripts/setup_database.py)
+CREATE TABLE IF NOT EXISTS taxonomy_cache (
+    species_id VARCHAR(50) PRIMARY KEY,
+    common_name VARCHAR(255),
+    scientific_name VARCHAR(255),
+    phylum VARCHAR(100),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Environmental Zones Table
 -- Define marine environmental zones for analysis
 CREATE TABLE IF NOT EXISTS environmental_zones (
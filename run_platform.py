@@ -6,28 +6,39 @@ Complete platform runner with all components
 
 import os
 import sys
-import subprocess
 import time
+import shutil
+import subprocess
 import argparse
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
-def run_command(command, description, cwd=None):
-    """Run a command with proper error handling"""
+def run_command(command, description, cwd=None, env=None):
+    """Run a command (argument list) with proper error handling"""
     print(f"🔄 {description}...")
     
     try:
         if cwd is None:
             cwd = os.path.dirname(os.path.abspath(__file__))
+        
+        # Only pass cwd when it actually differs: CPython can use the
+        # posix_spawn fast path (no fork of this process) when cwd is None,
+        # close_fds is False and the executable has a directory component.
+        # Our fds are non-inheritable by default.
+        if os.path.abspath(cwd) == os.getcwd():
+            cwd = None
+        
+        if not os.path.dirname(command[0]):
+            path = (env if env is not None else os.environ).get('PATH')
+            executable = shutil.which(command[0], path=path)
+            if executable:
+                command = [executable, *command[1:]]
             
         result = subprocess.run(
             command,
             cwd=cwd,
+            env=env,
             capture_output=True,
             text=True,
-            shell=True
+            close_fds=False
         )
         
         if result.returncode == 0:
@@ -51,22 +62,26 @@ def check_docker():
     
     try:
         result = subprocess.run(
-            "docker --version",
+            ["docker", "--version"],
             capture_output=True,
-            text=True,
-            shell=True
+            text=True
         )
         
         if result.returncode == 0:
             print("✅ Docker is available")
             
-            # Check if Docker daemon is running
-            result = subprocess.run(
-                "docker info",
-                capture_output=True,
-                text=True,
-                shell=True
-            )
+            # Check if Docker daemon is running. `docker version` only hits the
+            # daemon's cheap /version endpoint, unlike the full `docker info`
+            try:
+                result = subprocess.run(
+                    ["docker", "version", "--format", "{{.Server.Version}}"],
+                    capture_output=True,
+                    text=True,
+                    timeout=5
+                )
+            except subprocess.TimeoutExpired:
+                print("❌ Docker daemon is not responding")
+                return False
             
             if result.returncode == 0:
                 print("✅ Docker daemon is running")
@@ -113,11 +128,18 @@ def setup_environment():
     env_file = '.env'
     env_example = '.env.example'
     
+    # Warm runs: .env is already at least as new as its template
+    try:
+        if os.path.getmtime(env_file) >= os.path.getmtime(env_example):
+            print("ℹ️  .env file already exists")
+            return True
+    except OSError:
+        pass
+    
     if not os.path.exists(env_file):
         if os.path.exists(env_example):
             try:
-                with open(env_example, 'r') as src, open(env_file, 'w') as dst:
-                    dst.write(src.read())
+                shutil.copyfile(env_example, env_file)
                 print("✅ Created .env file from .env.example")
             except Exception as e:
                 print(f"❌ Error creating .env file: {e}")
@@ -126,10 +148,34 @@ def setup_environment():
             print("❌ .env.example file not found")
             return False
     else:
-        print("ℹ️  .env file already exists")
+        # Never overwrite local settings; just point out the newer template
+        print("ℹ️  .env file already exists (older than .env.example, check for new settings)")
     
     return True
 
+def compose_images_missing(env=None):
+    """Check whether any docker-compose service has no image locally yet"""
+    try:
+        services = subprocess.run(
+            ["docker-compose", "config", "--services"],
+            capture_output=True,
+            text=True,
+            env=env
+        )
+        images = subprocess.run(
+            ["docker-compose", "images", "-q"],
+            capture_output=True,
+            text=True,
+            env=env
+        )
+    except Exception:
+        return True
+    
+    if services.returncode != 0 or images.returncode != 0:
+        return True
+    
+    return len(images.stdout.split()) < len(services.stdout.split())
+
 def run_docker_setup():
     """Start Docker services"""
     print("🐳 Starting Docker services...")
@@ -139,16 +185,26 @@ def run_docker_setup():
         print("❌ docker-compose.yml not found")
         return False
     
+    # On a cold start pull all images concurrently before starting, so it
+    # costs the slowest image download rather than the sum of all of them.
+    # Warm starts skip the registry round-trip (and :latest upgrades).
+    compose_env = {**os.environ, "COMPOSE_PARALLEL_LIMIT": "8"}
+    
+    commands = []
+    if compose_images_missing(compose_env):
+        commands.append((["docker-compose", "pull", "--ignore-pull-failures"], "Pulling Docker images"))
+    else:
+        print("ℹ️  Docker images already present, skipping pull")
+    
     # Start services
-    commands = [
-        ("docker-compose up -d", "Starting Docker services"),
-        ("docker-compose ps", "Checking service status")
+    commands += [
+        (["docker-compose", "up", "-d"], "Starting Docker services"),
+        (["docker-compose", "ps"], "Checking service status")
     ]
     
     for command, description in commands:
-        if not run_command(command, description):
+        if not run_command(command, description, env=compose_env):
             return False
-        time.sleep(2)  # Brief pause between commands
     
     # Wait for services to be ready
     print("⏳ Waiting for services to be ready (30 seconds)...")
@@ -158,48 +214,54 @@ def run_docker_setup():
 
 def run_database_setup():
     """Initialize databases"""
-    return run_command("python scripts/setup_database.py", "Setting up databases")
+    return run_command([sys.executable, "scripts/setup_database.py"], "Setting up databases")
 
 def run_data_ingestion():
     """Insert sample data"""
-    return run_command("python scripts/ingest_data.py", "Ingesting sample data")
+    return run_command([sys.executable, "scripts/ingest_data.py"], "Ingesting sample data")
 
 def run_data_query():
     """Run data queries"""
-    return run_command("python scripts/query_data.py", "Running data queries")
+    return run_command([sys.executable, "scripts/query_data.py"], "Running data queries")
 
 def run_edna_test():
     """Test eDNA matching"""
-    return run_command("python scripts/edna_matcher.py --mode test", "Testing eDNA matching")
+    return run_command([sys.executable, "scripts/edna_matcher.py", "--mode", "test"], "Testing eDNA matching")
 
 def print_status_report():
     """Print final status and instructions"""
-    print("\n" + "=" * 60)
-    print("🌊 MARINE DATA INTEGRATION PLATFORM - STATUS REPORT")
-    print("=" * 60)
+    lines = [
+        "\n" + "=" * 60,
+        "🌊 MARINE DATA INTEGRATION PLATFORM - STATUS REPORT",
+        "=" * 60,
+        
+        "\n🎯 Platform Components:",
+        "  ✅ PostgreSQL + PostGIS Database",
+        "  ✅ MongoDB Database",
+        "  ✅ Python Data Ingestion Scripts",
+        "  ✅ Data Query & Analysis Tools",
+        "  ✅ K-mer Based eDNA Sequence Matching",
+        "  ✅ Docker Container Setup",
+        
+        "\n🔗 Access Points:",
+        "  PostgreSQL: localhost:5432",
+        "  MongoDB: localhost:27017",
+        "  pgAdmin: http://localhost:8080 (admin@marine.com / admin123)",
+        "  MongoDB Express: http://localhost:8081 (admin / admin123)",
+        
+        "\n🛠️  Available Commands:",
+        "  Data Queries: python scripts/query_data.py",
+        "  eDNA Matching: python scripts/edna_matcher.py",
+        "  Interactive eDNA: python scripts/edna_matcher.py --mode interactive",
+        "  Batch Testing: python scripts/edna_matcher.py --mode test",
+        
+        "\n🚀 Platform is ready for hackathon development!",
+        "📚 Check README.md for detailed usage instructions",
+    ]
     
-    print("\n🎯 Platform Components:")
-    print("  ✅ PostgreSQL + PostGIS Database")
-    print("  ✅ MongoDB Database") 
-    print("  ✅ Python Data Ingestion Scripts")
-    print("  ✅ Data Query & Analysis Tools")
-    print("  ✅ K-mer Based eDNA Sequence Matching")
-    print("  ✅ Docker Container Setup")
-    
-    print("\n🔗 Access Points:")
-    print("  PostgreSQL: localhost:5432")
-    print("  MongoDB: localhost:27017")
-    print("  pgAdmin: http://localhost:8080 (admin@marine.com / admin123)")
-    print("  MongoDB Express: http://localhost:8081 (admin / admin123)")
-    
-    print("\n🛠️  Available Commands:")
-    print("  Data Queries: python scripts/query_data.py")
-    print("  eDNA Matching: python scripts/edna_matcher.py")
-    print("  Interactive eDNA: python scripts/edna_matcher.py --mode interactive")
-    print("  Batch Testing: python scripts/edna_matcher.py --mode test")
-    
-    print("\n🚀 Platform is ready for hackathon development!")
-    print("📚 Check README.md for detailed usage instructions")
+    # Emit the whole report with a single write instead of one per line
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 def main():
     """Main platform runner"""
@@ -213,6 +275,10 @@ def main():
     
     args = parser.parse_args()
     
+    # Load environment variables (deferred so --help stays lightweight)
+    from dotenv import load_dotenv
+    load_dotenv()
+    
     print("🌊 Marine Data Integration Platform - Quick Start")
     print("=" * 60)
     
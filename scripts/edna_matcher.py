@@ -7,28 +7,181 @@ K-mer based sequence matching algorithm for species identification
 import os
 import sys
 import json
+import shutil
+import hashlib
+from bisect import bisect_right
 from pymongo import MongoClient
-from collections import defaultdict, Counter
+from collections import defaultdict
+from functools import lru_cache
 from datetime import datetime, timezone
 import argparse
+import numpy as np
 from dotenv import load_dotenv
 
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba is optional; vectorized NumPy kernels are used without it
+    HAS_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 # Load environment variables
 load_dotenv()
 
+# On-disk cache of built reference databases (see build_reference_database)
+REFERENCE_CACHE_DIR = os.getenv(
+    'EDNA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'edna_matcher')
+)
+
+# Bump when the cached array layout changes so stale caches are ignored
+REFERENCE_CACHE_VERSION = 2
+
+# Largest k for which a dense 4**k k-mer profile per species is kept
+# (4**10 uint8 counts = 1 MB per species)
+MAX_DENSE_K = 10
+
+# Largest k whose 2-bit codes fit in a signed 64-bit integer
+MAX_K = 31
+
+# Matching score = Jaccard similarity and k-mer frequency similarity blend
+JACCARD_WEIGHT = 0.7
+FREQUENCY_WEIGHT = 0.3
+
+# Confidence levels for scores in [-inf, 50), [50, 70), [70, 85), [85, inf)
+_CONF_LEVELS = ('very_low', 'low', 'medium', 'high')
+_CONF_BINS = (50.0, 70.0, 85.0)
+
+# Bottom-k MinHash sketch size, slack (in Jaccard %) allowed for the
+# sketch estimate, and how many candidates per query get exact rescoring
+SKETCH_SIZE = 256
+SKETCH_MARGIN = 10.0
+SKETCH_RESCORE = 32
+_SKETCH_PAD = np.iinfo(np.uint64).max
+
+# K-mer counts are stored as uint8 and saturate at this value; the
+# min/max frequency ratio barely moves for counts this high
+KMER_COUNT_DTYPE = np.uint8
+MAX_KMER_COUNT = np.iinfo(KMER_COUNT_DTYPE).max
+
+# 2-bit nucleotide codes indexed by ASCII byte; -1 marks non-ACGT bases
+_BASE_LUT = np.full(256, -1, dtype=np.int8)
+for _code, _base in enumerate(b'ACGT'):
+    _BASE_LUT[_base] = _code
+    _BASE_LUT[_base | 0x20] = _code  # lower-case bases map to the same code
+
+@njit(cache=True, nogil=True)
+def _encode_kmers(seq_bytes, k, lut):
+    """
+    Encode every valid k-mer of a sequence as a 2-bit packed integer
+    
+    Successive k-mers share k-1 bases, so each code is derived from the
+    previous one with a shift and mask instead of re-reading the window.
+    The compiled kernel releases the GIL, so concurrent requests in the
+    threaded API server do not serialise on it.
+    
+    Args:
+        seq_bytes (np.ndarray): Sequence as uint8 array
+        k (int): K-mer length
+        lut (np.ndarray): Base lookup table (see _BASE_LUT)
+        
+    Returns:
+        np.ndarray: int64 k-mer codes in sequence order
+    """
+    n = seq_bytes.shape[0]
+    out = np.empty(max(n - k + 1, 0), dtype=np.int64)
+    mask = (1 << (2 * k)) - 1
+    code = 0
+    valid_run = 0
+    count = 0
+    
+    for i in range(n):
+        base = int(lut[seq_bytes[i]])
+        if base < 0:
+            # K-mers spanning an ambiguous base (e.g. N) are skipped
+            valid_run = 0
+            code = 0
+            continue
+        
+        code = ((code << 2) | base) & mask
+        valid_run += 1
+        if valid_run >= k:
+            out[count] = code
+            count += 1
+    
+    return out[:count]
+
+def _hash_kmers(codes):
+    """
+    Hash k-mer codes to well-mixed uint64 values (splitmix64 finalizer)
+    
+    Args:
+        codes (np.ndarray): K-mer codes
+        
+    Returns:
+        np.ndarray: uint64 hashes
+    """
+    x = codes.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _encode_kmers_vectorized(seq_bytes, k, lut):
+    """
+    NumPy equivalent of _encode_kmers for when numba is not installed
+    
+    Validity is a single O(L) pass: a window starting at i is valid when
+    the last non-ACGT base at or before i+k-1 lies before i.
+    
+    Args:
+        seq_bytes (np.ndarray): Sequence as uint8 array
+        k (int): K-mer length
+        lut (np.ndarray): Base lookup table (see _BASE_LUT)
+        
+    Returns:
+        np.ndarray: int64 k-mer codes in sequence order
+    """
+    n = seq_bytes.shape[0]
+    if n < k:
+        return np.empty(0, dtype=np.int64)
+    
+    bases = lut[seq_bytes].astype(np.int64)
+    invalid = bases < 0
+    last_invalid = np.maximum.accumulate(np.where(invalid, np.arange(n), -1))
+    n_windows = n - k + 1
+    valid = last_invalid[k - 1:] < np.arange(n_windows)
+    
+    bases[invalid] = 0
+    codes = np.zeros(n_windows, dtype=np.int64)
+    for offset in range(k):
+        codes = (codes << 2) | bases[offset:offset + n_windows]
+    
+    return codes[valid]
+
 class eDNAMatcher:
-    def __init__(self, k=5, min_score=50.0):
+    def __init__(self, k=5, min_score=50.0, use_sketches=False):
         """
         Initialize eDNA matcher with k-mer parameters
         
         Args:
             k (int): K-mer length for sequence analysis
             min_score (float): Minimum matching score threshold
+            use_sketches (bool): Pick candidates with MinHash sketches and
+                only score those exactly (approximate, for large references)
         """
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+        
         self.k = k
         self.min_score = min_score
         self.reference_db = {}
+        self.reference_matrix = None
+        self.reference_nnz = np.zeros(0, dtype=np.int64)
+        self.species_ids = []
         self.species_info = {}
+        self.use_sketches = use_sketches
+        self.reference_sketches = None
         
     def generate_kmers(self, sequence):
         """
@@ -38,102 +191,462 @@ class eDNAMatcher:
             sequence (str): DNA sequence
             
         Returns:
-            list: List of k-mers
+            np.ndarray: Integer-encoded k-mers (2 bits per base)
         """
-        sequence = sequence.upper().strip()
-        kmers = []
+        # Case and surrounding whitespace are handled by _BASE_LUT (whitespace
+        # is an invalid base), so the string is never copied to upper case
+        seq_bytes = np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
         
-        for i in range(len(sequence) - self.k + 1):
-            kmer = sequence[i:i + self.k]
-            # Only include k-mers with valid DNA bases
-            if all(base in 'ATGC' for base in kmer):
-                kmers.append(kmer)
-                
-        return kmers
+        if HAS_NUMBA:
+            return _encode_kmers(seq_bytes, self.k, _BASE_LUT)
+        return _encode_kmers_vectorized(seq_bytes, self.k, _BASE_LUT)
     
-    def build_reference_database(self, db):
+    def build_kmer_profile(self, kmer_codes):
+        """
+        Count k-mer occurrences
+        
+        Args:
+            kmer_codes (np.ndarray): Encoded k-mers from generate_kmers
+            
+        Returns:
+            np.ndarray or tuple: Dense uint8 count vector of length 4**k, or
+            (sorted_codes, counts) arrays when k is too large for a dense table
+        """
+        if self.k <= MAX_DENSE_K:
+            counts = np.bincount(kmer_codes, minlength=4 ** self.k)
+            return np.minimum(counts, MAX_KMER_COUNT).astype(KMER_COUNT_DTYPE)
+        
+        codes, counts = np.unique(kmer_codes, return_counts=True)
+        return codes, np.minimum(counts, MAX_KMER_COUNT).astype(KMER_COUNT_DTYPE)
+    
+    def build_reference_database(self, db, use_cache=True):
         """
         Build k-mer reference database from MongoDB eDNA sequences
         
+        The built profiles are cached on disk, keyed by k and a fingerprint
+        of the eDNA/taxonomy collections, and memory-mapped on later runs.
+        
         Args:
             db: MongoDB database connection
+            use_cache (bool): Load/save the on-disk reference cache
         """
         print("🔬 Building k-mer reference database...")
         
+        self.reference_sketches = None
+        
+        cache_path = None
+        if use_cache:
+            try:
+                cache_path = self._reference_cache_path(db)
+                if self._load_reference_cache(cache_path):
+                    print(f"⚡ Loaded cached reference database from {cache_path}")
+                    self._index_reference_profiles()
+                    self._print_reference_summary()
+                    return
+            except Exception as e:
+                print(f"⚠️  Could not read reference cache: {e}")
+        
+        # Discard anything a failed cache load left behind
+        self.species_ids = []
+        self.species_info = {}
+        
         # Get reference sequences from MongoDB
         edna_collection = db.edna_sequences
         taxonomy_collection = db.taxonomy_data
         
-        sequences = list(edna_collection.find())
+        # Stream only the fields we need instead of materialising every document
+        sequences = edna_collection.find(
+            {}, projection={'sequence': 1, 'matched_species_id': 1}
+        ).batch_size(500)
+        species_kmers = defaultdict(list)
         
         for seq_record in sequences:
             species_id = seq_record['matched_species_id']
             sequence = seq_record['sequence']
             
             # Generate k-mers for this sequence
-            kmers = self.generate_kmers(sequence)
+            species_kmers[species_id].append(self.generate_kmers(sequence))
+        
+        # Store species information (one bulk lookup for all species)
+        taxonomy_docs = taxonomy_collection.find(
+            {"species_id": {"$in": list(species_kmers)}},
+            projection={'species_id': 1, 'species': 1, 'common_name': 1, 'phylum': 1}
+        )
+        for species_data in taxonomy_docs:
+            self.species_info.setdefault(species_data['species_id'], {
+                'scientific_name': species_data.get('species', 'Unknown'),
+                'common_name': species_data.get('common_name', 'Unknown'),
+                'phylum': species_data.get('phylum', 'Unknown')
+            })
+        
+        # One k-mer profile per species; dense profiles are stacked into a
+        # single (n_species, 4**k) uint8 matrix indexed by k-mer code
+        self.species_ids = list(species_kmers)
+        profiles = [self.build_kmer_profile(np.concatenate(codes)) for codes in species_kmers.values()]
+        
+        if self.k <= MAX_DENSE_K:
+            self.reference_matrix = np.vstack(profiles) if profiles else np.zeros((0, 4 ** self.k), dtype=KMER_COUNT_DTYPE)
+            self.reference_db = {}
+        else:
+            self.reference_matrix = None
+            self.reference_db = dict(zip(self.species_ids, profiles))
+        
+        if cache_path:
+            try:
+                self._save_reference_cache(cache_path)
+            except Exception as e:
+                print(f"⚠️  Could not write reference cache: {e}")
+        
+        self._index_reference_profiles()
+        self._print_reference_summary()
+    
+    def sketch(self, profile):
+        """
+        Bottom-k MinHash sketch of a k-mer profile
+        
+        Args:
+            profile: Dense or (sorted_codes, counts) profile
             
-            if species_id not in self.reference_db:
-                self.reference_db[species_id] = Counter()
-                
-            # Add k-mers to reference database
-            for kmer in kmers:
-                self.reference_db[species_id][kmer] += 1
+        Returns:
+            np.ndarray: SKETCH_SIZE sorted uint64 hashes, padded with the
+            maximum uint64 value when the profile has fewer distinct k-mers
+        """
+        codes = np.flatnonzero(profile) if isinstance(profile, np.ndarray) else profile[0]
+        hashes = _hash_kmers(np.asarray(codes))
+        
+        if len(hashes) > SKETCH_SIZE:
+            hashes = np.partition(hashes, SKETCH_SIZE - 1)[:SKETCH_SIZE]
+        
+        sketch = np.full(SKETCH_SIZE, _SKETCH_PAD, dtype=np.uint64)
+        sketch[:len(hashes)] = np.sort(hashes)
+        return sketch
+    
+    def build_reference_sketches(self):
+        """Sketch every reference profile into a (n_species, SKETCH_SIZE) array"""
+        sketches = [self.sketch(profile) for _, profile in self.iter_reference_profiles()]
+        self.reference_sketches = (np.vstack(sketches) if sketches
+                                   else np.zeros((0, SKETCH_SIZE), dtype=np.uint64))
+    
+    def estimate_jaccard(self, query_sketch):
+        """
+        Estimate Jaccard similarity to every species from MinHash sketches
+        
+        Uses the bottom-k estimator over the union of both sketches, which
+        is exact when both profiles have at most SKETCH_SIZE distinct k-mers.
+        
+        Args:
+            query_sketch (np.ndarray): Sketch from sketch()
+            
+        Returns:
+            np.ndarray: Estimated Jaccard similarity (0-100) per species
+        """
+        n_species = len(self.reference_sketches)
+        merged = np.sort(np.hstack([
+            self.reference_sketches, np.broadcast_to(query_sketch, (n_species, SKETCH_SIZE))
+        ]), axis=1)
+        
+        # In the sorted merge a hash present in both sketches appears twice in a row
+        shared = np.zeros(merged.shape, dtype=bool)
+        shared[:, :-1] = (merged[:, 1:] == merged[:, :-1]) & (merged[:, :-1] != _SKETCH_PAD)
+        distinct = np.ones(merged.shape, dtype=bool)
+        distinct[:, 1:] = merged[:, 1:] != merged[:, :-1]
+        distinct &= merged != _SKETCH_PAD
+        
+        # Bottom SKETCH_SIZE hashes of the union
+        in_sketch = distinct & (np.cumsum(distinct, axis=1) <= SKETCH_SIZE)
+        union = in_sketch.sum(axis=1)
+        
+        return np.divide((shared & in_sketch).sum(axis=1) * 100, union,
+                         out=np.zeros(n_species), where=union > 0)
+    
+    def _sketch_candidates(self, query_kmers):
+        """
+        Reference rows worth scoring exactly, chosen from sketch estimates
+        
+        Args:
+            query_kmers: Query profile from build_kmer_profile
+            
+        Returns:
+            np.ndarray: Up to SKETCH_RESCORE row indices, best estimate first
+        """
+        if self.reference_sketches is None:
+            self.build_reference_sketches()
+        
+        estimates = self.estimate_jaccard(self.sketch(query_kmers))
+        rows = np.flatnonzero(self.max_reachable_score(np.minimum(estimates + SKETCH_MARGIN, 100)) >= self.min_score)
+        return rows[np.argsort(-estimates[rows], kind='stable')[:SKETCH_RESCORE]]
+    
+    def _index_reference_profiles(self):
+        """Precompute per-species statistics that every query needs"""
+        # Distinct k-mers per species (|R|), so queries never rescan the
+        # reference matrix just to size the union
+        if self.reference_matrix is not None:
+            self.reference_nnz = np.count_nonzero(self.reference_matrix, axis=1)
+        else:
+            self.reference_nnz = np.array([len(codes) for codes, _ in self.reference_db.values()], dtype=np.int64)
+    
+    def _print_reference_summary(self):
+        """Print reference database size"""
+        print(f"✅ Reference database built with {len(self.species_ids)} species")
+        print(f"📊 Total k-mer profiles: {int(self.reference_nnz.sum())}")
+    
+    def _reference_cache_path(self, db):
+        """
+        Cache directory for the current reference data
+        
+        The key covers k, the cache layout version, collection sizes and the
+        newest eDNA record, so inserts invalidate it. Use --no-cache after
+        editing existing records in place.
+        
+        Args:
+            db: MongoDB database connection
+            
+        Returns:
+            str: Path of the cache directory
+        """
+        edna_collection = db.edna_sequences
+        latest = edna_collection.find_one(sort=[('_id', -1)], projection={'_id': 1})
+        
+        fingerprint = json.dumps([
+            REFERENCE_CACHE_VERSION,
+            self.k,
+            db.name,
+            edna_collection.estimated_document_count(),
+            db.taxonomy_data.estimated_document_count(),
+            str(latest['_id']) if latest else None
+        ])
+        digest = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+        
+        return os.path.join(REFERENCE_CACHE_DIR, f"refdb_k{self.k}_{digest}")
+    
+    def _save_reference_cache(self, cache_path):
+        """
+        Persist reference profiles as .npy arrays plus a JSON sidecar
+        
+        Args:
+            cache_path (str): Cache directory from _reference_cache_path
+        """
+        tmp_path = f"{cache_path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        
+        if self.reference_matrix is not None:
+            np.save(os.path.join(tmp_path, 'matrix.npy'), self.reference_matrix)
+        else:
+            # Sparse profiles are concatenated with row offsets
+            profiles = list(self.reference_db.values())
+            lengths = [len(codes) for codes, _ in profiles]
+            np.save(os.path.join(tmp_path, 'codes.npy'),
+                    np.concatenate([codes for codes, _ in profiles] or [np.empty(0, dtype=np.int64)]))
+            np.save(os.path.join(tmp_path, 'counts.npy'),
+                    np.concatenate([counts for _, counts in profiles] or [np.empty(0, dtype=KMER_COUNT_DTYPE)]))
+            np.save(os.path.join(tmp_path, 'offsets.npy'), np.cumsum([0] + lengths))
+        
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'species_ids': self.species_ids,
+                'species_info': [[species_id, info] for species_id, info in self.species_info.items()]
+            }, f)
+        
+        # Swap the finished directory into place so readers never see a partial cache
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.replace(tmp_path, cache_path)
+        
+        # Every ingestion changes the fingerprint; drop the superseded caches
+        # for this k (other processes' in-progress .tmp directories are kept)
+        cache_dir, cache_name = os.path.split(cache_path)
+        prefix = f"refdb_k{self.k}_"
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name != cache_name and '.tmp' not in name:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    
+    def _load_reference_cache(self, cache_path):
+        """
+        Load reference profiles saved by _save_reference_cache
+        
+        Arrays are memory-mapped so the OS page cache is shared across runs.
+        
+        Args:
+            cache_path (str): Cache directory from _reference_cache_path
             
-            # Store species information
-            if species_id not in self.species_info:
-                species_data = taxonomy_collection.find_one({"species_id": species_id})
-                if species_data:
-                    self.species_info[species_id] = {
-                        'scientific_name': species_data.get('species', 'Unknown'),
-                        'common_name': species_data.get('common_name', 'Unknown'),
-                        'phylum': species_data.get('phylum', 'Unknown')
-                    }
-        
-        print(f"✅ Reference database built with {len(self.reference_db)} species")
-        print(f"📊 Total k-mer profiles: {sum(len(kmers) for kmers in self.reference_db.values())}")
+        Returns:
+            bool: True if the cache existed and was loaded
+        """
+        meta_file = os.path.join(cache_path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return False
+        
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        
+        self.species_ids = meta['species_ids']
+        self.species_info = {species_id: info for species_id, info in meta['species_info']}
+        
+        if self.k <= MAX_DENSE_K:
+            self.reference_matrix = np.load(os.path.join(cache_path, 'matrix.npy'), mmap_mode='r')
+            self.reference_db = {}
+        else:
+            codes = np.load(os.path.join(cache_path, 'codes.npy'), mmap_mode='r')
+            counts = np.load(os.path.join(cache_path, 'counts.npy'), mmap_mode='r')
+            offsets = np.load(os.path.join(cache_path, 'offsets.npy'))
+            self.reference_matrix = None
+            self.reference_db = {
+                species_id: (codes[offsets[i]:offsets[i + 1]], counts[offsets[i]:offsets[i + 1]])
+                for i, species_id in enumerate(self.species_ids)
+            }
+        
+        return True
+    
+    def iter_reference_profiles(self):
+        """
+        Iterate over reference k-mer profiles
+        
+        Yields:
+            tuple: (species_id, profile) with a dense matrix row or a
+            (sorted_codes, counts) pair
+        """
+        if self.reference_matrix is not None:
+            yield from zip(self.species_ids, self.reference_matrix)
+        else:
+            yield from self.reference_db.items()
+    
+    @staticmethod
+    def _distinct_kmers(profile):
+        """Number of distinct k-mers in a profile"""
+        if isinstance(profile, np.ndarray):
+            return int(np.count_nonzero(profile))
+        return len(profile[0])
     
     def calculate_match_score(self, query_kmers, reference_kmers):
         """
         Calculate matching score between query and reference k-mers
         
         Args:
-            query_kmers (Counter): Query k-mers
-            reference_kmers (Counter): Reference k-mers
+            query_kmers (np.ndarray or tuple): Query k-mer profile
+            reference_kmers (np.ndarray or tuple): Reference k-mer profile
             
         Returns:
             float: Matching score (0-100)
         """
-        if not query_kmers or not reference_kmers:
+        if isinstance(query_kmers, np.ndarray):
+            return self._dense_match_score(query_kmers, reference_kmers)
+        
+        q_codes, q_counts = query_kmers
+        r_codes, r_counts = reference_kmers
+        
+        if len(q_codes) == 0 or len(r_codes) == 0:
             return 0.0
         
-        # Calculate Jaccard similarity
-        intersection = len(set(query_kmers.keys()) & set(reference_kmers.keys()))
-        union = len(set(query_kmers.keys()) | set(reference_kmers.keys()))
+        # Both code arrays are sorted and unique, so the intersection is a
+        # linear merge and the union follows from |Q| + |R| - |Q ∩ R|
+        _, q_idx, r_idx = np.intersect1d(q_codes, r_codes, assume_unique=True, return_indices=True)
+        intersection = len(q_idx)
+        union = len(q_codes) + len(r_codes) - intersection
+        
+        jaccard_score = (intersection / union) * 100
+        
+        if intersection == 0:
+            return jaccard_score
+        
+        # Weight by k-mer frequency similarity
+        q_freq = q_counts[q_idx]
+        r_freq = r_counts[r_idx]
+        frequency_score = np.sum(np.minimum(q_freq, r_freq) / np.maximum(q_freq, r_freq))
+        frequency_score = (frequency_score / intersection) * 100
+        
+        # Combine scores (weighted average)
+        return float((jaccard_score * JACCARD_WEIGHT) + (frequency_score * FREQUENCY_WEIGHT))
+    
+    def _dense_match_score(self, query_kmers, reference_kmers):
+        """Matching score for dense count vectors (same formula as the sparse path)"""
+        # Only the common-k-mer mask is built; |Q ∪ R| = |Q| + |R| - |Q ∩ R|
+        common = (query_kmers > 0) & (reference_kmers > 0)
+        
+        intersection = int(np.count_nonzero(common))
+        union = int(np.count_nonzero(query_kmers)) + int(np.count_nonzero(reference_kmers)) - intersection
         
         if union == 0:
             return 0.0
-            
+        
         jaccard_score = (intersection / union) * 100
         
-        # Weight by k-mer frequency similarity
-        common_kmers = set(query_kmers.keys()) & set(reference_kmers.keys())
-        frequency_score = 0.0
-        
-        if common_kmers:
-            for kmer in common_kmers:
-                q_freq = query_kmers[kmer]
-                r_freq = reference_kmers[kmer]
-                frequency_score += min(q_freq, r_freq) / max(q_freq, r_freq)
+        if intersection == 0:
+            return jaccard_score
+        
+        q_freq = query_kmers[common]
+        r_freq = reference_kmers[common]
+        frequency_score = np.sum(np.minimum(q_freq, r_freq) / np.maximum(q_freq, r_freq))
+        frequency_score = (frequency_score / intersection) * 100
+        
+        # Combine scores (weighted average)
+        return float((jaccard_score * JACCARD_WEIGHT) + (frequency_score * FREQUENCY_WEIGHT))
+    
+    @staticmethod
+    def max_reachable_score(jaccard_score):
+        """
+        Upper bound on the matching score given the Jaccard part alone
+        
+        The frequency similarity is at most 100, so species whose bound is
+        below min_score can be skipped before their exact score is computed.
+        
+        Args:
+            jaccard_score (float or np.ndarray): Jaccard similarity (0-100)
             
-            frequency_score = (frequency_score / len(common_kmers)) * 100
+        Returns:
+            float or np.ndarray: Highest score the species could still reach
+        """
+        return jaccard_score * JACCARD_WEIGHT + 100 * FREQUENCY_WEIGHT
+    
+    @staticmethod
+    def _size_bound(q_nnz, r_nnz):
+        """Upper bound on the Jaccard similarity from distinct k-mer counts alone"""
+        return np.minimum(q_nnz, r_nnz) / np.maximum(np.maximum(q_nnz, r_nnz), 1) * 100
+    
+    def score_reference_matrix(self, query_kmers):
+        """
+        Score a dense query profile against every species at once
+        
+        Only the columns of k-mers present in the query are read; the
+        union is derived as |R| + |Q| - |R ∩ Q| so no OR mask is built.
+        Species that provably cannot reach min_score are pruned first by
+        profile size and then by Jaccard before the frequency term.
+        
+        Args:
+            query_kmers (np.ndarray): Dense query profile from build_kmer_profile
             
-            # Combine scores (weighted average)
-            final_score = (jaccard_score * 0.7) + (frequency_score * 0.3)
-        else:
-            final_score = jaccard_score
+        Returns:
+            tuple: (rows, scores) for reference_matrix rows scoring >= min_score
+        """
+        q_mask = query_kmers > 0
+        q_counts = query_kmers[q_mask]
+        q_nnz = len(q_counts)
+        ref_nnz = self.reference_nnz
+        
+        # Pre-filter on profile size: |R ∩ Q| / |R ∪ Q| <= min(|R|, |Q|) / max(|R|, |Q|)
+        rows = np.flatnonzero(self.max_reachable_score(self._size_bound(q_nnz, ref_nnz)) >= self.min_score)
+        # Gather only the (surviving species x query k-mers) block in one
+        # fancy-index pass; full rows are never copied out of the matrix
+        ref_counts = self.reference_matrix[np.ix_(rows, np.flatnonzero(q_mask))]
+        
+        intersection = np.count_nonzero(ref_counts, axis=1)
+        union = ref_nnz[rows] + q_nnz - intersection
+        scores = intersection / union * 100
+        
+        # Only species that share k-mers and can still reach min_score get
+        # the (more expensive) frequency similarity term
+        refine = np.flatnonzero((intersection > 0) & (self.max_reachable_score(scores) >= self.min_score))
+        if len(refine):
+            ref_counts = ref_counts[refine]
+            
+            # max() is never zero here because every query count is positive,
+            # and k-mers absent from the reference contribute min() == 0
+            ratios = np.minimum(ref_counts, q_counts) / np.maximum(ref_counts, q_counts)
+            frequency_score = ratios.sum(axis=1) / intersection[refine] * 100
             
-        return final_score
+            # Combine scores (weighted average)
+            scores[refine] = (scores[refine] * JACCARD_WEIGHT) + (frequency_score * FREQUENCY_WEIGHT)
+        
+        hits = scores >= self.min_score
+        return rows[hits], scores[hits]
     
     def match_sequence(self, query_sequence, top_n=5):
         """
@@ -146,36 +659,67 @@ class eDNAMatcher:
         Returns:
             list: List of match results
         """
-        query_kmers = Counter(self.generate_kmers(query_sequence))
+        # Nothing to match against until the reference database is built
+        if not self.species_ids:
+            return []
+        
+        query_codes = self.generate_kmers(query_sequence)
         
-        if not query_kmers:
+        if len(query_codes) == 0:
             return []
         
+        query_kmers = self.build_kmer_profile(query_codes)
+        
+        # Every path yields reference row indices and their scores as arrays
+        if self.use_sketches:
+            # Approximate: only the best sketch candidates are scored exactly
+            profiles = self.reference_matrix if self.k <= MAX_DENSE_K else list(self.reference_db.values())
+            rows = self._sketch_candidates(query_kmers)
+            scores = np.array([self.calculate_match_score(query_kmers, profiles[i]) for i in rows])
+        elif self.k <= MAX_DENSE_K:
+            rows, scores = self.score_reference_matrix(query_kmers)
+        else:
+            # Skip species whose profile size alone rules out min_score
+            profiles = list(self.reference_db.values())
+            bounds = self.max_reachable_score(self._size_bound(len(query_kmers[0]), self.reference_nnz))
+            rows = np.flatnonzero(bounds >= self.min_score)
+            scores = np.array([self.calculate_match_score(query_kmers, profiles[i]) for i in rows])
+        
+        hits = scores >= self.min_score
+        rows, scores = rows[hits], scores[hits]
+        
+        # Rank by rounded score (descending), ties in reference order; only
+        # the top_n candidates are partitioned out and sorted
+        keys = np.round(scores, 2)
+        if 0 < top_n < len(keys):
+            cutoff = np.partition(keys, len(keys) - top_n)[len(keys) - top_n]
+            keep = keys >= cutoff
+            rows, scores, keys = rows[keep], scores[keep], keys[keep]
+        top = np.lexsort((rows, -keys))[:top_n]
+        
+        # Result dicts are only materialised for the returned matches
+        query_kmer_count = self._distinct_kmers(query_kmers)
+        confidence_levels = self.get_confidence_levels(scores[top])
         matches = []
         
-        for species_id, reference_kmers in self.reference_db.items():
-            score = self.calculate_match_score(query_kmers, reference_kmers)
+        for i, confidence_level in zip(top, confidence_levels):
+            species_id = self.species_ids[rows[i]]
+            species_info = self.species_info.get(species_id, {})
             
-            if score >= self.min_score:
-                species_info = self.species_info.get(species_id, {})
-                
-                match_result = {
-                    'species_id': species_id,
-                    'scientific_name': species_info.get('scientific_name', 'Unknown'),
-                    'common_name': species_info.get('common_name', 'Unknown'),
-                    'phylum': species_info.get('phylum', 'Unknown'),
-                    'matching_score': round(score, 2),
-                    'confidence_level': self.get_confidence_level(score),
-                    'query_length': len(query_sequence),
-                    'query_kmers': len(query_kmers)
-                }
-                
-                matches.append(match_result)
-        
-        # Sort by matching score (descending)
-        matches.sort(key=lambda x: x['matching_score'], reverse=True)
+            match_result = {
+                'species_id': species_id,
+                'scientific_name': species_info.get('scientific_name', 'Unknown'),
+                'common_name': species_info.get('common_name', 'Unknown'),
+                'phylum': species_info.get('phylum', 'Unknown'),
+                'matching_score': round(float(scores[i]), 2),
+                'confidence_level': confidence_level,
+                'query_length': len(query_sequence),
+                'query_kmers': query_kmer_count
+            }
+            
+            matches.append(match_result)
         
-        return matches[:top_n]
+        return matches
     
     def get_confidence_level(self, score):
         """
@@ -187,14 +731,19 @@ class eDNAMatcher:
         Returns:
             str: Confidence level
         """
-        if score >= 85:
-            return "high"
-        elif score >= 70:
-            return "medium"
-        elif score >= 50:
-            return "low"
-        else:
-            return "very_low"
+        return _CONF_LEVELS[bisect_right(_CONF_BINS, score)]
+    
+    def get_confidence_levels(self, scores):
+        """
+        Determine confidence levels for many matching scores at once
+        
+        Args:
+            scores (array-like): Matching scores
+            
+        Returns:
+            list: Confidence level per score
+        """
+        return [_CONF_LEVELS[i] for i in np.searchsorted(_CONF_BINS, scores, side='right')]
     
     def batch_match_sequences(self, sequences):
         """
@@ -250,6 +799,11 @@ def run_interactive_mode(matcher):
     print("=" * 50)
     print("Enter DNA sequences to match (or 'quit' to exit)")
     
+    # Users often paste the same sequence repeatedly while exploring
+    @lru_cache(maxsize=512)
+    def cached_match(sequence):
+        return tuple(matcher.match_sequence(sequence))
+    
     while True:
         try:
             sequence = input("\n🔬 Enter DNA sequence: ").strip()
@@ -264,7 +818,7 @@ def run_interactive_mode(matcher):
                 print("⚠️  Invalid sequence. Please use only A, T, G, C, N characters.")
                 continue
             
-            matches = matcher.match_sequence(sequence)
+            matches = cached_match(sequence.upper())
             
             print(f"\n🎯 Matching Results for sequence (length: {len(sequence)}):")
             print("-" * 40)
@@ -287,6 +841,8 @@ def run_interactive_mode(matcher):
         except Exception as e:
             print(f"❌ Error processing sequence: {e}")
     
+    cache_info = cached_match.cache_info()
+    print(f"\n📦 Query cache: {cache_info.hits} hits, {cache_info.misses} misses")
     print("\n👋 Exiting interactive mode")
 
 def run_batch_test_mode(matcher):
@@ -302,8 +858,11 @@ def run_batch_test_mode(matcher):
     
     results = matcher.batch_match_sequences(test_sequences)
     
-    print(f"📊 Testing {len(test_sequences)} sequences:")
-    print("-" * 40)
+    # The per-sequence report is collected and written in one go
+    lines = [
+        f"📊 Testing {len(test_sequences)} sequences:",
+        "-" * 40
+    ]
     
     correct_predictions = 0
     total_predictions = 0
@@ -314,33 +873,36 @@ def run_batch_test_mode(matcher):
         expected_match = test_seq.get('expected_match')
         description = test_seq.get('description', 'Test sequence')
         
-        print(f"\n🔬 {seq_id}: {description}")
+        lines.append(f"\n🔬 {seq_id}: {description}")
         
         if matches:
             best_match = matches[0]
-            print(f"   Best match: {best_match['common_name']} ({best_match['species_id']})")
-            print(f"   Score: {best_match['matching_score']}% - {best_match['confidence_level'].upper()}")
+            lines.append(f"   Best match: {best_match['common_name']} ({best_match['species_id']})")
+            lines.append(f"   Score: {best_match['matching_score']}% - {best_match['confidence_level'].upper()}")
             
             # Check accuracy if expected match is provided
             if expected_match:
                 total_predictions += 1
                 if best_match['species_id'] == expected_match:
-                    print("   ✅ CORRECT prediction")
+                    lines.append("   ✅ CORRECT prediction")
                     correct_predictions += 1
                 else:
-                    print(f"   ❌ INCORRECT - expected {expected_match}")
+                    lines.append(f"   ❌ INCORRECT - expected {expected_match}")
         else:
-            print("   ❌ No matches found")
+            lines.append("   ❌ No matches found")
             if expected_match:
                 total_predictions += 1
-                print(f"   Expected: {expected_match}")
+                lines.append(f"   Expected: {expected_match}")
     
     # Calculate accuracy
     if total_predictions > 0:
         accuracy = (correct_predictions / total_predictions) * 100
-        print(f"\n📈 Testing Results:")
-        print(f"   Accuracy: {accuracy:.1f}% ({correct_predictions}/{total_predictions})")
-        print(f"   Algorithm Performance: {'Good' if accuracy >= 80 else 'Needs Improvement'}")
+        lines.append(f"\n📈 Testing Results:")
+        lines.append(f"   Accuracy: {accuracy:.1f}% ({correct_predictions}/{total_predictions})")
+        lines.append(f"   Algorithm Performance: {'Good' if accuracy >= 80 else 'Needs Improvement'}")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 def save_match_results(matches, output_file="edna_matches.json"):
     """Save matching results to JSON file"""
@@ -361,9 +923,16 @@ def main():
                        help='Minimum matching score')
     parser.add_argument('--sequence', type=str, help='Single sequence to match')
     parser.add_argument('--save', action='store_true', help='Save results to file')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Rebuild the k-mer reference database instead of using the on-disk cache')
+    parser.add_argument('--sketch', action='store_true',
+                       help='Approximate matching: pre-select species with MinHash sketches')
     
     args = parser.parse_args()
     
+    if not 1 <= args.k <= MAX_K:
+        parser.error(f"--k must be between 1 and {MAX_K}")
+    
     print("🌊 Marine Data Integration Platform - eDNA Matcher")
     print("=" * 60)
     
@@ -374,11 +943,11 @@ def main():
         sys.exit(1)
     
     # Initialize matcher
-    matcher = eDNAMatcher(k=args.k, min_score=args.min_score)
+    matcher = eDNAMatcher(k=args.k, min_score=args.min_score, use_sketches=args.sketch)
     
     try:
         # Build reference database
-        matcher.build_reference_database(db)
+        matcher.build_reference_database(db, use_cache=not args.no_cache)
         
         if args.sequence:
             # Single sequence mode
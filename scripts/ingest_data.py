@@ -7,7 +7,7 @@ Inserts sample oceanographic, morphometric, and spatial data into PostgreSQL
 import os
 import sys
 import psycopg2
-from psycopg2.extras import Json, RealDictCursor
+from psycopg2.extras import Json, RealDictCursor, execute_values
 from datetime import datetime, timezone
 import uuid
 from dotenv import load_dotenv
@@ -32,8 +32,6 @@ def get_postgres_connection():
 
 def insert_sampling_points(conn):
     """Insert sample sampling points data"""
-    cursor = conn.cursor()
-    
     sample_points = [
         {
             'location': (76.2, 10.5),  # Kochi, Kerala
@@ -98,15 +96,13 @@ def insert_sampling_points(conn):
     ]
     
     sampling_point_ids = []
+    rows = []
     
     for point in sample_points:
         point_id = str(uuid.uuid4())
         sampling_point_ids.append(point_id)
         
-        cursor.execute("""
-            INSERT INTO sampling_points (id, location, depth_meters, parameters, metadata, timestamp)
-            VALUES (%s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s)
-        """, (
+        rows.append((
             point_id,
             point['location'][0], point['location'][1],
             point['depth_meters'],
@@ -115,14 +111,17 @@ def insert_sampling_points(conn):
             datetime.now(timezone.utc)
         ))
     
-    conn.commit()
+    with conn.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO sampling_points (id, location, depth_meters, parameters, metadata, timestamp)
+            VALUES %s
+        """, rows, template="(%s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s)", page_size=1000)
+    
     print(f"✅ Inserted {len(sample_points)} sampling points")
     return sampling_point_ids
 
 def insert_oceanographic_data(conn, sampling_point_ids):
     """Insert detailed oceanographic measurements"""
-    cursor = conn.cursor()
-    
     # Sample locations corresponding to sampling points
     locations = [
         (76.2, 10.5), (75.8, 11.2), (76.5, 9.8), (74.9, 12.1)
@@ -143,17 +142,13 @@ def insert_oceanographic_data(conn, sampling_point_ids):
         {'type': 'ph', 'value': 7.9, 'unit': 'ph_units', 'depth': 15.0}
     ]
     
-    measurement_count = 0
+    rows = []
     
     for i, location in enumerate(locations):
         sampling_point_id = sampling_point_ids[i] if i < len(sampling_point_ids) else sampling_point_ids[0]
         
         for param in parameters_data:
-            cursor.execute("""
-                INSERT INTO oceanographic_data 
-                (sampling_point_id, location, parameter_type, value, unit, measurement_depth, timestamp, instrument_type)
-                VALUES (%s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s, %s, %s)
-            """, (
+            rows.append((
                 sampling_point_id,
                 location[0], location[1],
                 param['type'],
@@ -163,15 +158,18 @@ def insert_oceanographic_data(conn, sampling_point_ids):
                 datetime.now(timezone.utc),
                 'CTD Sensor'
             ))
-            measurement_count += 1
     
-    conn.commit()
-    print(f"✅ Inserted {measurement_count} oceanographic measurements")
+    with conn.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO oceanographic_data 
+            (sampling_point_id, location, parameter_type, value, unit, measurement_depth, timestamp, instrument_type)
+            VALUES %s
+        """, rows, template="(%s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s, %s, %s)", page_size=1000)
+    
+    print(f"✅ Inserted {len(rows)} oceanographic measurements")
 
 def insert_morphometric_data(conn):
     """Insert sample morphometric data for marine specimens"""
-    cursor = conn.cursor()
-    
     specimens = [
         {
             'species_id': 'sp_001',
@@ -223,25 +221,26 @@ def insert_morphometric_data(conn):
         }
     ]
     
-    for specimen in specimens:
-        cursor.execute("""
+    rows = [(
+        specimen['species_id'],
+        specimen['specimen_id'],
+        specimen['location'][0], specimen['location'][1],
+        specimen['depth'],
+        Json(specimen['metrics']),
+        specimen['collector'],
+        specimen['preservation'],
+        specimen['condition'],
+        datetime.now(timezone.utc)
+    ) for specimen in specimens]
+    
+    with conn.cursor() as cursor:
+        execute_values(cursor, """
             INSERT INTO morphometric_data 
             (species_id, specimen_id, sample_location, depth_collected, metrics, 
              collector_name, preservation_method, condition_notes, timestamp)
-            VALUES (%s, %s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s, %s, %s)
-        """, (
-            specimen['species_id'],
-            specimen['specimen_id'],
-            specimen['location'][0], specimen['location'][1],
-            specimen['depth'],
-            Json(specimen['metrics']),
-            specimen['collector'],
-            specimen['preservation'],
-            specimen['condition'],
-            datetime.now(timezone.utc)
-        ))
+            VALUES %s
+        """, rows, template="(%s, %s, ST_SetSRID(ST_Point(%s, %s), 4326), %s, %s, %s, %s, %s, %s)", page_size=1000)
     
-    conn.commit()
     print(f"✅ Inserted {len(specimens)} morphometric specimens")
 
 def verify_data_insertion(conn):
@@ -299,14 +298,17 @@ def main():
         sys.exit(1)
     
     try:
-        print("📍 Inserting sampling points...")
-        sampling_point_ids = insert_sampling_points(conn)
-        
-        print("🌡️  Inserting oceanographic data...")
-        insert_oceanographic_data(conn, sampling_point_ids)
-        
-        print("🐟 Inserting morphometric data...")
-        insert_morphometric_data(conn)
+        # All inserts share one transaction: committed together on success,
+        # rolled back together on error
+        with conn:
+            print("📍 Inserting sampling points...")
+            sampling_point_ids = insert_sampling_points(conn)
+            
+            print("🌡️  Inserting oceanographic data...")
+            insert_oceanographic_data(conn, sampling_point_ids)
+            
+            print("🐟 Inserting morphometric data...")
+            insert_morphometric_data(conn)
         
         print("✔️  Verifying data insertion...")
         verify_data_insertion(conn)
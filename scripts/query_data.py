@@ -4,11 +4,16 @@ Marine Data Integration Platform - Data Query Script
 Query and analyze marine data from PostgreSQL and MongoDB databases
 """
 
+import io
 import os
 import sys
+import queue
+import threading
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
 import json
 from dotenv import load_dotenv
@@ -16,6 +21,22 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# PostgreSQL connections (and worker threads) used to run the report queries
+QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', '4'))
+
+class ThreadOutput:
+    """sys.stdout proxy that collects each worker thread's output separately"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return getattr(self.local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
 def get_postgres_connection():
     """Create PostgreSQL connection"""
     try:
@@ -45,48 +66,60 @@ def get_mongodb_connection():
         print(f"❌ Error connecting to MongoDB: {e}")
         return None, None
 
+# One formatted block per sampling location (see query_sampling_locations)
+LOCATION_TEMPLATE = (
+    "📍 Location: (%.2f, %.2f)\n"
+    "   Depth: %sm | Temperature: %s°C\n"
+    "   Salinity: %s PSU | pH: %s\n"
+    "   Dissolved O₂: %s mg/L\n"
+    "   Method: %s | Vessel: %s\n"
+    "   Sampled: %s\n"
+)
+
 def query_sampling_locations(conn):
     """Query sampling locations with their environmental parameters"""
     print("\n🌊 SAMPLING LOCATIONS")
     print("=" * 50)
     
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            id,
-            ST_X(location) as longitude,
-            ST_Y(location) as latitude,
-            depth_meters,
-            parameters->>'temperature' as temperature,
-            parameters->>'salinity' as salinity,
-            parameters->>'ph' as ph,
-            parameters->>'dissolved_oxygen' as dissolved_oxygen,
-            metadata->>'vessel' as vessel,
-            metadata->>'method' as method,
-            timestamp
-        FROM sampling_points
-        ORDER BY timestamp DESC
-    """)
-    
-    locations = cursor.fetchall()
-    
-    for loc in locations:
-        print(f"📍 Location: ({loc['longitude']:.2f}, {loc['latitude']:.2f})")
-        print(f"   Depth: {loc['depth_meters']}m | Temperature: {loc['temperature']}°C")
-        print(f"   Salinity: {loc['salinity']} PSU | pH: {loc['ph']}")
-        print(f"   Dissolved O₂: {loc['dissolved_oxygen']} mg/L")
-        print(f"   Method: {loc['method']} | Vessel: {loc['vessel']}")
-        print(f"   Sampled: {loc['timestamp'].strftime('%Y-%m-%d %H:%M')}")
-        print()
-    
-    return len(locations)
+    # Named (server-side) cursor: rows are streamed in batches of itersize
+    # instead of buffering the whole table client-side with fetchall().
+    # Plain tuple rows avoid building a dict per row.
+    location_count = 0
+    
+    with conn.cursor(name='sampling_locations', cursor_factory=psycopg2.extensions.cursor) as cursor:
+        cursor.itersize = 2000
+        cursor.execute("""
+            SELECT 
+                ST_X(location) as longitude,
+                ST_Y(location) as latitude,
+                depth_meters,
+                parameters->>'temperature' as temperature,
+                parameters->>'salinity' as salinity,
+                parameters->>'ph' as ph,
+                parameters->>'dissolved_oxygen' as dissolved_oxygen,
+                metadata->>'vessel' as vessel,
+                metadata->>'method' as method,
+                timestamp
+            FROM sampling_points
+            ORDER BY timestamp DESC
+        """)
+        
+        for (longitude, latitude, depth_meters, temperature, salinity, ph,
+             dissolved_oxygen, vessel, method, timestamp) in cursor:
+            print(LOCATION_TEMPLATE % (
+                longitude, latitude, depth_meters, temperature, salinity, ph,
+                dissolved_oxygen, method, vessel, timestamp.strftime('%Y-%m-%d %H:%M')
+            ))
+            location_count += 1
+    
+    return location_count
 
 def query_oceanographic_trends(conn):
     """Analyze oceanographic parameter trends"""
     print("\n📈 OCEANOGRAPHIC PARAMETER ANALYSIS")
     print("=" * 50)
     
-    cursor = conn.cursor()
+    cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
     
     # Temperature analysis
     cursor.execute("""
@@ -104,12 +137,12 @@ def query_oceanographic_trends(conn):
     
     parameters = cursor.fetchall()
     
-    for param in parameters:
-        print(f"🌡️  {param['parameter_type'].upper()}:")
-        print(f"   Average: {param['avg_value']:.2f}")
-        print(f"   Range: {param['min_value']:.2f} - {param['max_value']:.2f}")
-        print(f"   Std Dev: {param['std_dev']:.2f}")
-        print(f"   Measurements: {param['measurements']}")
+    for parameter_type, avg_value, min_value, max_value, std_dev, measurements in parameters:
+        print(f"🌡️  {parameter_type.upper()}:")
+        print(f"   Average: {avg_value:.2f}")
+        print(f"   Range: {min_value:.2f} - {max_value:.2f}")
+        print(f"   Std Dev: {std_dev:.2f}")
+        print(f"   Measurements: {measurements}")
         print()
 
 def query_spatial_analysis(conn):
@@ -164,6 +197,8 @@ def query_species_taxonomy(db):
                 "scientific_name": "$species"
             }}
         }},
+        # Only the first 3 species per phylum are shown, so only those are sent back
+        {"$project": {"species_count": 1, "species": {"$slice": ["$species", 3]}}},
         {"$sort": {"species_count": -1}}
     ]
     
@@ -171,10 +206,10 @@ def query_species_taxonomy(db):
     
     for phylum in phyla:
         print(f"🔬 Phylum: {phylum['_id']} ({phylum['species_count']} species)")
-        for species in phylum['species'][:3]:  # Show first 3 species
+        for species in phylum['species']:  # First 3 species
             print(f"   • {species['common_name']} ({species['scientific_name']})")
-        if len(phylum['species']) > 3:
-            print(f"   ... and {len(phylum['species']) - 3} more")
+        if phylum['species_count'] > 3:
+            print(f"   ... and {phylum['species_count'] - 3} more")
         print()
 
 def query_edna_data(db):
@@ -184,20 +219,18 @@ def query_edna_data(db):
     
     edna = db.edna_sequences
     
-    # Get sequence matching statistics
-    sequences = list(edna.find())
-    
+    # Get sequence matching statistics (counted server-side)
     print(f"📊 eDNA Database Summary:")
-    print(f"   Total sequences: {len(sequences)}")
+    print(f"   Total sequences: {edna.count_documents({})}")
     
     # Group by confidence levels
-    confidence_stats = {}
-    for seq in sequences:
-        conf = seq.get('confidence_level', 'unknown')
-        confidence_stats[conf] = confidence_stats.get(conf, 0) + 1
+    confidence_stats = edna.aggregate([
+        {"$group": {"_id": {"$ifNull": ["$confidence_level", "unknown"]}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ])
     
-    for conf, count in confidence_stats.items():
-        print(f"   {conf.title()} confidence: {count}")
+    for conf in confidence_stats:
+        print(f"   {conf['_id'].title()} confidence: {conf['count']}")
     
     print(f"\n🎯 Top eDNA Matches:")
     high_confidence_seqs = list(edna.find(
@@ -219,7 +252,14 @@ def query_research_studies(db):
     
     studies = db.research_studies
     
-    ongoing_studies = list(studies.find({"status": "ongoing"}))
+    # Large batches so the result comes back without extra getMore round-trips
+    ongoing_studies = studies.find(
+        {"status": "ongoing"},
+        {
+            "title": 1, "principal_investigator": 1, "institution": 1, "study_type": 1,
+            "study_area.name": 1, "start_date": 1, "end_date": 1, "target_species": 1
+        }
+    ).batch_size(1000)
     
     for study in ongoing_studies:
         print(f"🔬 {study['title']}")
@@ -235,56 +275,86 @@ def query_integrated_analysis(conn, db):
     print("\n🔄 INTEGRATED CROSS-DATABASE ANALYSIS")
     print("=" * 50)
     
-    # Get morphometric data from PostgreSQL
+    # Taxonomy names come from the taxonomy_cache table that setup_database.py
+    # mirrors from MongoDB; databases set up before it existed skip the join
     cursor = conn.cursor()
-    cursor.execute("""
+    cursor.execute("SELECT to_regclass('taxonomy_cache') IS NOT NULL AS has_cache")
+    has_cache = cursor.fetchone()['has_cache']
+    
+    if has_cache:
+        taxonomy_select = "t.common_name, t.scientific_name,"
+        taxonomy_join = "LEFT JOIN taxonomy_cache t USING (species_id)"
+        taxonomy_group = ", t.common_name, t.scientific_name"
+    else:
+        taxonomy_select = "NULL AS common_name, NULL AS scientific_name,"
+        taxonomy_join = taxonomy_group = ""
+    
+    # Morphometric data from PostgreSQL
+    cursor.execute(f"""
         SELECT 
-            species_id,
+            m.species_id,
+            {taxonomy_select}
             COUNT(*) as specimen_count,
-            AVG(CAST(metrics->>'total_length_cm' AS FLOAT)) as avg_length,
-            AVG(CAST(metrics->>'weight_g' AS FLOAT)) as avg_weight
-        FROM morphometric_data 
-        WHERE metrics->>'total_length_cm' IS NOT NULL
-        GROUP BY species_id
+            AVG(CAST(m.metrics->>'total_length_cm' AS FLOAT)) as avg_length,
+            AVG(CAST(m.metrics->>'weight_g' AS FLOAT)) as avg_weight
+        FROM morphometric_data m
+        {taxonomy_join}
+        WHERE m.metrics->>'total_length_cm' IS NOT NULL
+        GROUP BY m.species_id{taxonomy_group}
     """)
     
     morphometric_data = cursor.fetchall()
     
-    # Cross-reference with taxonomy data from MongoDB
-    taxonomy = db.taxonomy_data
+    # Species added to MongoDB since the cache was last synced are looked up
+    # there directly (one bulk query)
+    missing_ids = [morph['species_id'] for morph in morphometric_data
+                   if morph['common_name'] is None]
+    taxonomy_map = {}
+    if missing_ids:
+        for doc in db.taxonomy_data.find({"species_id": {"$in": missing_ids}},
+                                         {"species_id": 1, "common_name": 1, "species": 1}):
+            taxonomy_map.setdefault(doc['species_id'], doc)
     
     print("🐟 Species Morphometric Summary:")
     for morph in morphometric_data:
-        species_info = taxonomy.find_one({"species_id": morph['species_id']})
-        if species_info:
-            print(f"   {species_info['common_name']} ({species_info['species']}):")
-            print(f"      Specimens: {morph['specimen_count']}")
-            if morph['avg_length']:
-                print(f"      Avg Length: {morph['avg_length']:.1f} cm")
-            if morph['avg_weight']:
-                print(f"      Avg Weight: {morph['avg_weight']:.0f} g")
-            print()
+        if morph['common_name'] is not None:
+            common_name, scientific_name = morph['common_name'], morph['scientific_name']
+        elif morph['species_id'] in taxonomy_map:
+            species_info = taxonomy_map[morph['species_id']]
+            common_name, scientific_name = species_info['common_name'], species_info['species']
+        else:
+            continue
+        
+        print(f"   {common_name} ({scientific_name}):")
+        print(f"      Specimens: {morph['specimen_count']}")
+        if morph['avg_length']:
+            print(f"      Avg Length: {morph['avg_length']:.1f} cm")
+        if morph['avg_weight']:
+            print(f"      Avg Weight: {morph['avg_weight']:.0f} g")
+        print()
 
 def generate_summary_report(conn, db):
     """Generate a comprehensive summary report"""
     print("\n📋 PLATFORM SUMMARY REPORT")
     print("=" * 50)
     
-    # PostgreSQL stats
+    # PostgreSQL stats (one round-trip for all three counts)
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM sampling_points")
-    sp_count = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(*) as count FROM oceanographic_data")
-    od_count = cursor.fetchone()['count']
-    
-    cursor.execute("SELECT COUNT(*) as count FROM morphometric_data")
-    md_count = cursor.fetchone()['count']
-    
-    # MongoDB stats
-    taxonomy_count = db.taxonomy_data.count_documents({})
-    edna_count = db.edna_sequences.count_documents({})
-    studies_count = db.research_studies.count_documents({})
+    cursor.execute("""
+        SELECT 
+            (SELECT COUNT(*) FROM sampling_points) as sp_count,
+            (SELECT COUNT(*) FROM oceanographic_data) as od_count,
+            (SELECT COUNT(*) FROM morphometric_data) as md_count
+    """)
+    counts = cursor.fetchone()
+    sp_count, od_count, md_count = counts['sp_count'], counts['od_count'], counts['md_count']
+    
+    # MongoDB stats (counted concurrently; MongoClient is thread-safe)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        taxonomy_count, edna_count, studies_count = executor.map(
+            lambda collection: collection.count_documents({}),
+            [db.taxonomy_data, db.edna_sequences, db.research_studies]
+        )
     
     print("📊 Database Contents:")
     print(f"   Sampling Locations: {sp_count}")
@@ -303,6 +373,33 @@ def generate_summary_report(conn, db):
     print(f"   eDNA Matching: ✅ Functional")
     print(f"   Cross-DB Queries: ✅ Working")
 
+def run_query(output, pg_pool, query, uses_postgres):
+    """
+    Run one report query on a worker thread and return its printed output
+    
+    Args:
+        output (ThreadOutput): Installed sys.stdout proxy
+        pg_pool (queue.Queue): Pool of PostgreSQL connections
+        query (callable): Query function (takes a connection if uses_postgres)
+        uses_postgres (bool): Check out a connection from the pool
+        
+    Returns:
+        str: Everything the query printed
+    """
+    output.local.buffer = io.StringIO()
+    try:
+        if uses_postgres:
+            conn = pg_pool.get()
+            try:
+                query(conn)
+            finally:
+                pg_pool.put(conn)
+        else:
+            query()
+        return output.local.buffer.getvalue()
+    finally:
+        del output.local.buffer
+
 def main():
     """Main query execution function"""
     print("🌊 Marine Data Integration Platform - Data Explorer")
@@ -320,27 +417,53 @@ def main():
         print("❌ Failed to connect to MongoDB")
         sys.exit(1)
     
+    # The queries are independent, so they run concurrently, each PostgreSQL
+    # query on its own pooled connection (MongoClient is thread-safe)
+    pg_connections = [conn] + [get_postgres_connection() for _ in range(QUERY_WORKERS - 1)]
+    pg_pool = queue.Queue()
+    for pg_conn in pg_connections:
+        if pg_conn:
+            pg_pool.put(pg_conn)
+    
+    queries = [
+        (query_sampling_locations, True),
+        (query_oceanographic_trends, True),
+        (query_spatial_analysis, True),
+        (partial(query_species_taxonomy, db), False),
+        (partial(query_edna_data, db), False),
+        (partial(query_research_studies, db), False),
+        (partial(query_integrated_analysis, db=db), True),
+        (partial(generate_summary_report, db=db), True),
+    ]
+    
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    
     try:
-        # Execute various queries
-        query_sampling_locations(conn)
-        query_oceanographic_trends(conn)
-        query_spatial_analysis(conn)
-        query_species_taxonomy(db)
-        query_edna_data(db)
-        query_research_studies(db)
-        query_integrated_analysis(conn, db)
-        generate_summary_report(conn, db)
+        with ThreadPoolExecutor(max_workers=QUERY_WORKERS + 2) as executor:
+            futures = [
+                executor.submit(run_query, output, pg_pool, query, uses_postgres)
+                for query, uses_postgres in queries
+            ]
+            
+            # Print each report section in the original order
+            for future in futures:
+                output.stream.write(future.result())
         
+        sys.stdout = output.stream
         print("\n✨ Query analysis completed successfully!")
         print("💡 Try running 'python scripts/edna_matcher.py' to test DNA sequence matching")
         
     except Exception as e:
+        sys.stdout = output.stream
         print(f"❌ Error during query execution: {e}")
         sys.exit(1)
         
     finally:
-        if conn:
-            conn.close()
+        sys.stdout = output.stream
+        for pg_conn in pg_connections:
+            if pg_conn:
+                pg_conn.close()
         if mongo_client:
             mongo_client.close()
 
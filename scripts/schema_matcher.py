@@ -6,18 +6,26 @@ with existing database tables and collections.
 """
 
 import os
+import re
 import sys
 import json
 import csv
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional
 from collections import defaultdict
-import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+import heapq
 from difflib import SequenceMatcher
 from datetime import datetime
+from decimal import Decimal
 import argparse
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 # Database imports
 import psycopg2
@@ -25,20 +33,92 @@ from psycopg2.extras import RealDictCursor
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
+try:
+    from pyarrow import csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:  # pyarrow is optional; chunked pandas reads are used without it
+    HAS_PYARROW = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # orjson is optional; the json module is used without it
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:  # ijson is optional; large JSON files are loaded whole without it
+    HAS_IJSON = False
+
 # Load environment variables
 load_dotenv()
 
+# Separators ignored when comparing field names (str.translate deletion table)
+FIELD_SEPARATOR_TABLE = str.maketrans('', '', '_-.')
+
+# On-disk cache of extracted database schemas (see get_cached_schemas)
+SCHEMA_CACHE_FILE = os.getenv(
+    'SCHEMA_CACHE_FILE', os.path.join(os.path.expanduser('~'), '.cache', 'marine_schema_cache.json')
+)
+
+# Bump when the cached schema layout changes so stale caches are ignored
+SCHEMA_CACHE_VERSION = 1
+
+# Read size for counting CSV lines
+CSV_COUNT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Empty or whitespace-only line, which the CSV parser skips
+BLANK_CSV_LINE = re.compile(rb'\n[ \t\r]*\n')
+
+# JSON files above this size are stream-parsed when ijson is installed
+JSON_STREAMING_MIN_SIZE = 50 * 1024 * 1024
+
+# Below these batch sizes worker processes cost more to start and feed than
+# the analysis or matching they would take over (when --jobs is left at -1)
+PARALLEL_MIN_FILES = 64
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+def _decimals_to_float(value: Any) -> Any:
+    """Convert ijson's Decimal numbers to float, as json.loads returns them"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: _decimals_to_float(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decimals_to_float(item) for item in value]
+    return value
+
 class FileStructureAnalyzer:
     """Analyzes the structure of JSON and CSV files"""
     
     def __init__(self):
-        self.supported_extensions = {'.json', '.csv'}
+        # File suffix -> analyzer method
+        self.analyzers = {
+            '.json': self.analyze_json_file,
+            '.csv': self.analyze_csv_file
+        }
+        self.supported_extensions = set(self.analyzers)
     
     def analyze_json_file(self, file_path: Path) -> Dict[str, Any]:
         """Analyze JSON file structure"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if HAS_IJSON and file_path.stat().st_size > JSON_STREAMING_MIN_SIZE:
+                structure = self._analyze_json_array_streaming(file_path)
+                if structure is not None:
+                    return structure
+            
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            
+            if HAS_ORJSON:
+                try:
+                    data = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    # e.g. NaN or big integers, which only json accepts
+                    data = json.loads(raw)
+            else:
+                data = json.loads(raw)
             
             structure = {
                 'file_path': str(file_path),
@@ -70,6 +150,61 @@ class FileStructureAnalyzer:
                 'error': str(e)
             }
     
+    def _analyze_json_array_streaming(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Analyze a root-level JSON array one item at a time with ijson
+        
+        Only the first item is kept for structure analysis; the rest are
+        parsed one by one to count them, so memory stays at one item.
+        
+        Args:
+            file_path: Path to the JSON file
+            
+        Returns:
+            Optional[Dict]: Same structure as analyze_json_file, or None when
+            the root is not an array or ijson cannot parse the file
+        """
+        structure = {
+            'file_path': str(file_path),
+            'file_type': 'json',
+            'file_size': file_path.stat().st_size,
+            'fields': {},
+            'sample_data': {},
+            'nested_structures': {},
+            'arrays': []
+        }
+        
+        with open(file_path, 'rb', buffering=1 << 20) as f:
+            # Peek at the first non-whitespace byte for the root type
+            while True:
+                chunk = f.read(4096)
+                if not chunk:
+                    return None
+                chunk = chunk.lstrip()
+                if chunk:
+                    break
+            if not chunk.startswith(b'['):
+                return None
+            f.seek(0)
+            
+            try:
+                # Without use_float, ijson keeps integers of any width as int
+                # (json.loads does too) and returns other numbers as Decimal
+                items = ijson.items(f, 'item')
+                first = next(items, structure)  # structure marks an empty array
+                if first is structure:
+                    return structure
+                
+                structure['arrays'].append('root')
+                if isinstance(first, dict):
+                    structure['fields'], structure['sample_data'], structure['nested_structures'] = \
+                        self._analyze_dict_structure(_decimals_to_float(first))
+                    structure['array_length'] = 1 + sum(1 for _ in items)
+            except ijson.JSONError:
+                return None  # e.g. NaN, which only the json module accepts
+        
+        return structure
+    
     def analyze_csv_file(self, file_path: Path) -> Dict[str, Any]:
         """Analyze CSV file structure"""
         try:
@@ -86,23 +221,28 @@ class FileStructureAnalyzer:
                 'columns': list(df.columns)
             }
             
-            # Get column info and data types
-            for col in df.columns:
-                col_data = df[col].dropna()
+            # Get column info and data types (computed for all columns at once)
+            dtypes = df.dtypes.astype(str).tolist()
+            null_mask = df.isnull().to_numpy()
+            nullable = null_mask.any(axis=0)
+            has_values = ~null_mask.all(axis=0)
+            first_valid = (~null_mask).argmax(axis=0) if len(df) else has_values.astype(int)
+            unique_counts = df.nunique(dropna=True).tolist()
+            
+            for i, col in enumerate(df.columns):
                 structure['fields'][col] = {
-                    'type': str(df[col].dtype),
-                    'nullable': df[col].isnull().any(),
-                    'unique_values': len(col_data.unique()) if len(col_data) > 0 else 0
+                    'type': dtypes[i],
+                    'nullable': nullable[i],
+                    'unique_values': unique_counts[i]
                 }
                 
                 # Sample value (first non-null value)
-                if len(col_data) > 0:
-                    structure['sample_data'][col] = col_data.iloc[0]
+                if has_values[i]:
+                    structure['sample_data'][col] = df.iat[first_valid[i], i]
             
             # Get total row count (approximately)
             try:
-                full_df = pd.read_csv(file_path)
-                structure['total_rows'] = len(full_df)
+                structure['total_rows'] = self.count_csv_rows(file_path)
             except:
                 structure['total_rows'] = 'unknown'
             
@@ -115,47 +255,157 @@ class FileStructureAnalyzer:
                 'error': str(e)
             }
     
+    def analyze_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Analyze a JSON or CSV file, None for unsupported extensions"""
+        analyzer = self.analyzers.get(file_path.suffix)
+        return analyzer(file_path) if analyzer else None
+    
+    def analyze_many(self, file_paths: List[Path], max_workers: int = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze several files in parallel worker processes
+        
+        Args:
+            file_paths: Files to analyze
+            max_workers: Worker processes (None for one per CPU once the batch
+                reaches PARALLEL_MIN_FILES files or PARALLEL_MIN_BYTES, 1 to
+                stay in this process)
+            
+        Returns:
+            List[Optional[Dict]]: analyze_file results, in the order of file_paths
+        """
+        if max_workers is None:
+            parallel = (os.cpu_count() or 1) > 1 and (
+                len(file_paths) >= PARALLEL_MIN_FILES or
+                sum(file_path.stat().st_size for file_path in file_paths) >= PARALLEL_MIN_BYTES)
+        else:
+            parallel = max_workers > 1 and len(file_paths) >= 2
+        
+        if not parallel:
+            return [self.analyze_file(file_path) for file_path in file_paths]
+        
+        # Parsing is CPU-bound and independent per file; workers only send
+        # back the structure summaries, never the file contents. Files are
+        # handed out in batches (about four per worker) so many small files
+        # do not pay one inter-process round-trip each.
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(file_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.analyze_file, file_paths, chunksize=chunksize))
+    
+    def count_csv_rows(self, file_path: Path) -> int:
+        """
+        Count the data rows of a CSV file without loading it into memory
+        
+        Args:
+            file_path: Path to the CSV file
+            
+        Returns:
+            int: Number of data rows (header excluded)
+        """
+        rows = self._count_csv_lines(file_path)
+        if rows is not None:
+            return rows
+        
+        if HAS_PYARROW:
+            try:
+                # Multithreaded C++ reader, streamed batch by batch
+                return sum(batch.num_rows for batch in pa_csv.open_csv(str(file_path)))
+            except Exception:
+                pass  # e.g. a type that changes mid-file; count with pandas instead
+        
+        # Only parse the first column, one chunk at a time
+        return sum(len(chunk) for chunk in pd.read_csv(file_path, usecols=[0], chunksize=100000))
+    
+    def _count_csv_lines(self, file_path: Path) -> Optional[int]:
+        """
+        Count the data rows of a CSV file by counting newline bytes
+        
+        Args:
+            file_path: Path to the CSV file
+            
+        Returns:
+            Optional[int]: Number of data rows, or None when quoted fields,
+            blank or whitespace-only lines or bare carriage-return line
+            endings mean lines and rows may differ
+        """
+        newlines = 0
+        # Last bytes seen (the whole last line while it is only whitespace),
+        # to spot blank lines across chunks
+        tail = b'\n'
+        
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(CSV_COUNT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                window = tail + chunk
+                if b'"' in chunk or BLANK_CSV_LINE.search(window):
+                    return None
+                # A \r not followed by \n (old Mac line endings); the last byte
+                # may still pair with a \n at the start of the next chunk
+                if b'\r' in window and b'\r' in window.replace(b'\r\n', b'')[:-1]:
+                    return None
+                
+                newlines += chunk.count(b'\n')
+                last_line = window.rfind(b'\n')
+                if last_line >= 0 and not window[last_line + 1:].strip(b' \t\r'):
+                    tail = window[last_line:]
+                else:
+                    tail = window[-2:]
+        
+        if tail.endswith(b'\r'):
+            return None
+        # A whitespace-only last line without a trailing newline
+        if not tail.endswith(b'\n') and tail.startswith(b'\n') and not tail[1:].strip(b' \t'):
+            return None
+        
+        # A last line without a trailing newline still counts; minus the header
+        lines = newlines if tail.endswith(b'\n') else newlines + 1
+        return max(lines - 1, 0)
+    
     def _analyze_dict_structure(self, data: dict, prefix: str = '') -> Tuple[Dict, Dict, Dict]:
-        """Recursively analyze dictionary structure"""
+        """Analyze dictionary structure, including nested objects"""
         fields = {}
         samples = {}
         nested = {}
         
-        for key, value in data.items():
-            full_key = f"{prefix}.{key}" if prefix else key
-            
-            if isinstance(value, dict):
-                nested[full_key] = 'object'
-                nested_fields, nested_samples, nested_nested = \
-                    self._analyze_dict_structure(value, full_key)
-                fields.update(nested_fields)
-                samples.update(nested_samples)
-                nested.update(nested_nested)
-            
-            elif isinstance(value, list):
-                if len(value) > 0:
-                    if isinstance(value[0], dict):
-                        nested[full_key] = 'array_of_objects'
-                        nested_fields, nested_samples, nested_nested = \
-                            self._analyze_dict_structure(value[0], full_key)
-                        fields.update(nested_fields)
-                        samples.update(nested_samples)
-                        nested.update(nested_nested)
+        # Depth-first walk with an explicit stack of (prefix, items) iterators,
+        # visiting keys in the same order a recursive walk would
+        stack = [(prefix, iter(data.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for key, value in items:
+                full_key = f"{prefix}.{key}" if prefix else key
+                
+                if isinstance(value, dict):
+                    nested[full_key] = 'object'
+                    stack.append((full_key, iter(value.items())))
+                    break
+                
+                elif isinstance(value, list):
+                    if len(value) > 0:
+                        if isinstance(value[0], dict):
+                            nested[full_key] = 'array_of_objects'
+                            stack.append((full_key, iter(value[0].items())))
+                            break
+                        else:
+                            fields[full_key] = {
+                                'type': f"array_of_{type(value[0]).__name__}",
+                                'array_length': len(value)
+                            }
+                            samples[full_key] = value[0]
                     else:
-                        fields[full_key] = {
-                            'type': f"array_of_{type(value[0]).__name__}",
-                            'array_length': len(value)
-                        }
-                        samples[full_key] = value[0]
+                        fields[full_key] = {'type': 'empty_array'}
+                        
                 else:
-                    fields[full_key] = {'type': 'empty_array'}
-                    
+                    fields[full_key] = {
+                        'type': type(value).__name__,
+                        'nullable': value is None
+                    }
+                    samples[full_key] = value
             else:
-                fields[full_key] = {
-                    'type': type(value).__name__,
-                    'nullable': value is None
-                }
-                samples[full_key] = value
+                stack.pop()
         
         return fields, samples, nested
 
@@ -166,6 +416,9 @@ class DatabaseSchemaExtractor:
         self.postgres_conn = None
         self.mongo_client = None
         self.mongo_db = None
+        # Set when get_postgres_tables/get_mongo_collections hit an error and
+        # returned partial schemas
+        self.extraction_failed = False
         self.logger = logging.getLogger(__name__)
     
     def connect_postgres(self) -> bool:
@@ -207,45 +460,45 @@ class DatabaseSchemaExtractor:
         tables = {}
         
         try:
-            # Get all tables in the database
+            # Get all tables in the database with their columns in one round-trip
+            # (LEFT JOIN so tables without columns are still listed)
             cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_type = 'BASE TABLE'
+                SELECT t.table_name, c.column_name, c.data_type, c.is_nullable, c.column_default
+                FROM information_schema.tables t
+                LEFT JOIN information_schema.columns c
+                    ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+                WHERE t.table_schema = 'public' 
+                AND t.table_type = 'BASE TABLE'
+                ORDER BY t.table_name, c.ordinal_position
             """)
             
-            table_names = [row['table_name'] for row in cursor.fetchall()]
-            
-            for table_name in table_names:
-                # Get column information
-                cursor.execute("""
-                    SELECT column_name, data_type, is_nullable, column_default
-                    FROM information_schema.columns
-                    WHERE table_name = %s
-                    ORDER BY ordinal_position
-                """, (table_name,))
+            for col in cursor:
+                table = tables.setdefault(col['table_name'], {
+                    'type': 'postgres_table',
+                    'columns': {}
+                })
                 
-                columns = {}
-                for col in cursor.fetchall():
-                    columns[col['column_name']] = {
+                if col['column_name'] is not None:
+                    table['columns'][col['column_name']] = {
                         'type': col['data_type'],
                         'nullable': col['is_nullable'] == 'YES',
                         'default': col['column_default']
                     }
-                
-                tables[table_name] = {
-                    'type': 'postgres_table',
-                    'columns': columns
-                }
         
         except Exception as e:
             self.logger.error(f"Error extracting PostgreSQL schema: {e}")
+            self.extraction_failed = True
         
         return tables
     
-    def get_mongo_collections(self) -> Dict[str, Dict]:
-        """Get MongoDB collection schemas by sampling documents"""
+    def get_mongo_collections(self, precise_counts: bool = False) -> Dict[str, Dict]:
+        """
+        Get MongoDB collection schemas by sampling documents
+        
+        Args:
+            precise_counts: Count documents exactly (a collection scan)
+                instead of reading the collection's stored count
+        """
         if self.mongo_client is None or self.mongo_db is None:
             return {}
         
@@ -290,49 +543,142 @@ class DatabaseSchemaExtractor:
                 collections[collection_name] = {
                     'type': 'mongo_collection',
                     'fields': schema_fields,
-                    'document_count': collection.count_documents({})
+                    'document_count': (collection.count_documents({}) if precise_counts
+                                       else collection.estimated_document_count())
                 }
         
         except Exception as e:
             self.logger.error(f"Error extracting MongoDB schema: {e}")
+            self.extraction_failed = True
         
         return collections
     
+    def schema_fingerprint(self) -> Dict[str, Any]:
+        """
+        Cheap fingerprint of the connected databases' schemas
+        
+        PostgreSQL contributes a digest of the public column definitions,
+        MongoDB its dbStats collection/object counts and data size, so
+        schema changes and inserts invalidate it. Both take one round-trip.
+        
+        Returns:
+            Dict: JSON-serializable fingerprint (None for unconnected databases)
+        """
+        fingerprint = {'version': SCHEMA_CACHE_VERSION, 'postgres': None, 'mongo': None}
+        
+        if self.postgres_conn:
+            with self.postgres_conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT md5(COALESCE(string_agg(
+                        table_name || '.' || column_name || ':' || data_type || ':' ||
+                        is_nullable || ':' || COALESCE(column_default, ''),
+                        ',' ORDER BY table_name, ordinal_position), ''))
+                    FROM information_schema.columns
+                    WHERE table_schema = 'public'
+                """)
+                fingerprint['postgres'] = cursor.fetchone()[0]
+        
+        if self.mongo_client is not None and self.mongo_db is not None:
+            stats = self.mongo_db.command('dbstats')
+            fingerprint['mongo'] = [self.mongo_db.name, stats.get('collections'),
+                                    stats.get('objects'), stats.get('dataSize')]
+        
+        return fingerprint
+    
+    def get_cached_schemas(self, cache_file: str = SCHEMA_CACHE_FILE,
+                           ttl: float = 3600) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """
+        PostgreSQL and MongoDB schemas, reused from disk while the databases are unchanged
+        
+        Args:
+            cache_file: JSON file holding the last extracted schemas
+            ttl: Maximum age in seconds of a cached entry, as a backstop for
+                in-place edits the fingerprint does not see
+            
+        Returns:
+            Tuple[Dict, Dict]: get_postgres_tables() and get_mongo_collections() results
+        """
+        try:
+            fingerprint = self.schema_fingerprint()
+        except Exception as e:
+            self.logger.warning(f"Could not fingerprint database schemas: {e}")
+            return self.get_postgres_tables(), self.get_mongo_collections()
+        
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['fingerprint'] == fingerprint and time.time() - cached['saved_at'] < ttl:
+                self.logger.info(f"Loaded cached database schemas from {cache_file}")
+                return cached['postgres'], cached['mongo']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Could not read schema cache: {e}")
+        
+        self.extraction_failed = False
+        postgres_schemas = self.get_postgres_tables()
+        mongo_schemas = self.get_mongo_collections()
+        
+        # A failed or empty extraction from a connected database is likely
+        # transient; serve it this once but do not cache it
+        if (self.extraction_failed or
+                (self.postgres_conn and not postgres_schemas) or
+                (self.mongo_db is not None and not mongo_schemas)):
+            self.logger.warning("Incomplete database schemas; not updating the schema cache")
+            return postgres_schemas, mongo_schemas
+        
+        try:
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            # Write then swap into place so readers never see a partial file
+            tmp_file = f"{cache_file}.tmp{os.getpid()}"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'fingerprint': fingerprint,
+                    'saved_at': time.time(),
+                    'postgres': postgres_schemas,
+                    'mongo': mongo_schemas
+                }, f)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            self.logger.warning(f"Could not write schema cache: {e}")
+        
+        return postgres_schemas, mongo_schemas
+    
     def _analyze_mongo_document(self, doc: dict, prefix: str = '') -> Tuple[Dict, Dict, Dict]:
         """Analyze a single MongoDB document structure"""
         fields = {}
         samples = {}
         nested = {}
         
-        for key, value in doc.items():
-            if key.startswith('_'):  # Skip MongoDB internal fields
-                continue
+        # Depth-first walk with an explicit stack, as in _analyze_dict_structure
+        stack = [(prefix, iter(doc.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for key, value in items:
+                if key.startswith('_'):  # Skip MongoDB internal fields
+                    continue
+                    
+                full_key = f"{prefix}.{key}" if prefix else key
                 
-            full_key = f"{prefix}.{key}" if prefix else key
-            
-            if isinstance(value, dict):
-                nested_fields, nested_samples, nested_nested = \
-                    self._analyze_mongo_document(value, full_key)
-                fields.update(nested_fields)
-                samples.update(nested_samples)
-                nested.update(nested_nested)
-            
-            elif isinstance(value, list):
-                if len(value) > 0 and isinstance(value[0], dict):
-                    nested_fields, nested_samples, nested_nested = \
-                        self._analyze_mongo_document(value[0], full_key)
-                    fields.update(nested_fields)
-                    samples.update(nested_samples)
-                    nested.update(nested_nested)
+                if isinstance(value, dict):
+                    stack.append((full_key, iter(value.items())))
+                    break
+                
+                elif isinstance(value, list):
+                    if len(value) > 0 and isinstance(value[0], dict):
+                        stack.append((full_key, iter(value[0].items())))
+                        break
+                    else:
+                        fields[full_key] = {
+                            'type': f"array_of_{type(value[0]).__name__}" if value else "empty_array"
+                        }
                 else:
                     fields[full_key] = {
-                        'type': f"array_of_{type(value[0]).__name__}" if value else "empty_array"
+                        'type': type(value).__name__
                     }
+                    samples[full_key] = value
             else:
-                fields[full_key] = {
-                    'type': type(value).__name__
-                }
-                samples[full_key] = value
+                stack.pop()
         
         return fields, samples, nested
     
@@ -348,15 +694,22 @@ class SchemaMatching:
     
     def __init__(self, similarity_threshold=0.6):
         self.similarity_threshold = similarity_threshold
+        # schema name -> (field names, prepare_fields() of their normalized names)
+        self._prepared_schema_fields = {}
+    
+    @staticmethod
+    def normalize_field_name(field: str) -> str:
+        """Normalize a field name (remove underscores, convert to lowercase)"""
+        return field.lower().translate(FIELD_SEPARATOR_TABLE)
     
     def calculate_field_similarity(self, field1: str, field2: str) -> float:
         """Calculate similarity between two field names"""
         # Normalize field names (remove underscores, convert to lowercase)
-        norm1 = re.sub(r'[_\-\.]', '', field1.lower())
-        norm2 = re.sub(r'[_\-\.]', '', field2.lower())
+        norm1 = self.normalize_field_name(field1)
+        norm2 = self.normalize_field_name(field2)
         
         # Use sequence matcher for similarity
-        similarity = SequenceMatcher(None, norm1, norm2).ratio()
+        similarity = SequenceMatcher(None, norm1, norm2, autojunk=False).ratio()
         
         # Boost for exact matches after normalization
         if norm1 == norm2:
@@ -368,48 +721,156 @@ class SchemaMatching:
         
         return similarity
     
-    def match_file_to_schema(self, file_structure: Dict, schemas: Dict[str, Dict]) -> List[Dict]:
-        """Match a file structure to database schemas"""
+    def prepare_fields(self, norm_fields: List[str]) -> Dict[str, Any]:
+        """
+        Lookups similarity_matrix needs for one side, reusable across calls
+        
+        Args:
+            norm_fields: Normalized field names
+            
+        Returns:
+            Dict: The names, as a list and a numpy string array, and each
+            name's positions
+        """
+        positions = defaultdict(list)
+        for j, norm in enumerate(norm_fields):
+            positions[norm].append(j)
+        
+        return {
+            'names': norm_fields,
+            'array': np.array(norm_fields, dtype=str),
+            'positions': dict(positions)
+        }
+    
+    def similarity_matrix(self, norm_fields1: List[str], norm_fields2: List[str],
+                          score_cutoff: float = 0.0, prepared2: Dict[str, Any] = None) -> np.ndarray:
+        """
+        calculate_field_similarity for every pair of normalized field names
+        
+        Args:
+            norm_fields1: Normalized field names (rows)
+            norm_fields2: Normalized field names (columns)
+            score_cutoff: Pairs that cannot reach this similarity are not
+                fully compared and may be reported lower than they are
+                (but never at or above the cutoff)
+            prepared2: prepare_fields(norm_fields2), if already computed
+        
+        Returns:
+            np.ndarray: (len(norm_fields1), len(norm_fields2)) similarities
+        """
+        matrix = np.zeros((len(norm_fields1), len(norm_fields2)))
+        for j, norm2 in enumerate(norm_fields2):
+            # One matcher per column so its b2j index is built once;
+            # autojunk off so long names are compared on every character
+            matcher = SequenceMatcher(None, b=norm2, autojunk=False)
+            for i, norm1 in enumerate(norm_fields1):
+                matcher.set_seq1(norm1)
+                # Length-only and character-count upper bounds first
+                if (matcher.real_quick_ratio() >= score_cutoff and
+                        matcher.quick_ratio() >= score_cutoff):
+                    matrix[i, j] = matcher.ratio()
+        
+        if prepared2 is None:
+            prepared2 = self.prepare_fields(norm_fields2)
+        
+        fields1 = np.array(norm_fields1, dtype=str)[:, None]
+        fields2 = prepared2['array'][None, :]
+        
+        # Boost for substring matches
+        substring = (np.char.find(fields2, fields1) >= 0) | (np.char.find(fields1, fields2) >= 0)
+        matrix = np.where(substring, np.maximum(matrix, 0.8), matrix)
+        
+        # Boost for exact matches after normalization: a hash lookup per
+        # field instead of comparing every pair
+        positions2 = prepared2['positions']
+        for i, norm1 in enumerate(norm_fields1):
+            if norm1 in positions2:
+                matrix[i, positions2[norm1]] = 1.0
+        
+        return matrix
+    
+    def _prepared_fields(self, schema_name: str, schema_fields: List[str]) -> Dict[str, Any]:
+        """Normalized and prepared schema field names, computed once per schema"""
+        cached = self._prepared_schema_fields.get(schema_name)
+        if cached is None or cached[0] != schema_fields:
+            norm_fields = [self.normalize_field_name(field) for field in schema_fields]
+            cached = (schema_fields, self.prepare_fields(norm_fields))
+            self._prepared_schema_fields[schema_name] = cached
+        return cached[1]
+    
+    def match_file_to_schema(self, file_structure: Dict, schemas: Dict[str, Dict],
+                             top_n: Optional[int] = None) -> List[Dict]:
+        """
+        Match a file structure to database schemas
+        
+        Args:
+            file_structure: FileStructureAnalyzer result
+            schemas: Database schemas by name
+            top_n: Only return the best top_n matches; schemas that cannot
+                score into them are skipped without being compared
+            
+        Returns:
+            List[Dict]: Matches sorted by match score, descending
+        """
         matches = []
         
-        file_fields = set(file_structure.get('fields', {}).keys())
+        file_fields = list(file_structure.get('fields', {}))
         if file_structure['file_type'] == 'csv':
-            file_fields = set(file_structure.get('columns', []))
+            file_fields = list(dict.fromkeys(file_structure.get('columns', [])))
+        norm_file_fields = [self.normalize_field_name(field) for field in file_fields]
         
-        for schema_name, schema_info in schemas.items():
-            schema_fields = set(schema_info.get('columns', {}).keys()) or set(schema_info.get('fields', {}).keys())
+        candidates = []
+        for position, (schema_name, schema_info) in enumerate(schemas.items()):
+            schema_fields = list(schema_info.get('columns', {})) or list(schema_info.get('fields', {}))
             
             if not schema_fields or not file_fields:
                 continue
             
-            # Calculate field matches
-            field_matches = []
-            total_similarity = 0
+            # Highest reachable match score: every file field matched at 1.0
+            best_possible = len(file_fields) / max(len(file_fields), len(schema_fields))
+            candidates.append((best_possible, position, schema_name, schema_info, schema_fields))
+        
+        if top_n:
+            # Most promising schemas first, so the cut-off rises quickly
+            candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        top_scores = []  # min-heap of the best top_n match scores so far
+        
+        for best_possible, position, schema_name, schema_info, schema_fields in candidates:
+            if top_n and len(top_scores) >= top_n and best_possible < top_scores[0]:
+                break  # neither this schema nor any later one can make the top_n
             
-            for file_field in file_fields:
-                best_match = None
-                best_similarity = 0
-                
-                for schema_field in schema_fields:
-                    similarity = self.calculate_field_similarity(file_field, schema_field)
-                    if similarity > best_similarity and similarity >= self.similarity_threshold:
-                        best_similarity = similarity
-                        best_match = schema_field
-                
-                if best_match:
-                    field_matches.append({
-                        'file_field': file_field,
-                        'schema_field': best_match,
-                        'similarity': best_similarity
-                    })
-                    total_similarity += best_similarity
+            # Best schema field for every file field from one similarity matrix
+            prepared = self._prepared_fields(schema_name, schema_fields)
+            matrix = self.similarity_matrix(norm_file_fields, prepared['names'],
+                                            score_cutoff=self.similarity_threshold, prepared2=prepared)
+            best_index = matrix.argmax(axis=1)
+            best_similarity = matrix[np.arange(len(file_fields)), best_index]
+            matched = np.flatnonzero((best_similarity >= self.similarity_threshold) & (best_similarity > 0))
+            
+            # Calculate field matches
+            field_matches = [
+                {
+                    'file_field': file_fields[i],
+                    'schema_field': schema_fields[best_index[i]],
+                    'similarity': float(best_similarity[i])
+                }
+                for i in matched
+            ]
             
             if field_matches:
+                total_similarity = sum(match['similarity'] for match in field_matches)
+                
                 # Calculate overall match score
                 match_score = total_similarity / max(len(file_fields), len(schema_fields))
                 coverage = len(field_matches) / len(file_fields)
                 
-                matches.append({
+                if top_n:
+                    if len(top_scores) < top_n:
+                        heapq.heappush(top_scores, match_score)
+                    else:
+                        heapq.heappushpop(top_scores, match_score)
+                
+                matches.append((position, {
                     'schema_name': schema_name,
                     'schema_type': schema_info.get('type', 'unknown'),
                     'match_score': match_score,
@@ -418,11 +879,30 @@ class SchemaMatching:
                     'matched_fields': len(field_matches),
                     'total_file_fields': len(file_fields),
                     'total_schema_fields': len(schema_fields)
-                })
+                }))
         
-        # Sort by match score descending
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
-        return matches
+        # Sort by match score descending (ties keep the schemas' order)
+        matches.sort(key=lambda x: (-x[1]['match_score'], x[0]))
+        return [match for _, match in matches[:top_n]]
+
+def _json_report_default(value: Any) -> Any:
+    """orjson fallback serializer matching json.dump(default=str) in _save_json_report"""
+    if isinstance(value, float):
+        return float(value)  # e.g. numpy.float64, which json writes as a number
+    return str(value)
+
+# Per-process matcher and schemas for parallel matching (see SchemaMatcher.match_files)
+_worker_matching = None
+
+def _init_matching_worker(matcher: SchemaMatching, schemas: Dict[str, Dict], top_n: int):
+    """Receive the matcher and schemas once per worker process"""
+    global _worker_matching
+    _worker_matching = (matcher, schemas, top_n)
+
+def _match_in_worker(file_structure: Dict) -> List[Dict]:
+    """Match one file structure in a worker process"""
+    matcher, schemas, top_n = _worker_matching
+    return matcher.match_file_to_schema(file_structure, schemas, top_n=top_n)
 
 class SchemaMatcher:
     """Main class that orchestrates the schema matching process"""
@@ -437,6 +917,11 @@ class SchemaMatcher:
         self.matcher = SchemaMatching(similarity_threshold)
         
         self.output_format = self.config.get('output_format', 'console')
+        # Worker processes for file analysis and matching (-1 for one per CPU,
+        # used only for batches past PARALLEL_MIN_FILES/PARALLEL_MIN_BYTES)
+        self.jobs = self.config.get('jobs', -1)
+        # Reuse database schemas cached on disk while the databases are unchanged
+        self.schema_cache = self.config.get('schema_cache', True)
         self.output_file = self.config.get('output_file', 'schema_matches.json')
         
         # Setup logging
@@ -448,11 +933,22 @@ class SchemaMatcher:
         log_level = self.config.get('log_level', 'INFO')
         log_file = self.config.get('log_file', '/tmp/schema_matcher.log')
         
+        # basicConfig leaves an already configured root logger alone
+        if logging.getLogger().handlers:
+            return
+        
+        # Log file writes happen on a listener thread; records are formatted
+        # by the QueueHandler, so the file handler writes them as they are
+        log_queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, logging.FileHandler(log_file))
+        listener.start()
+        atexit.register(listener.stop)  # flushes the queued records
+        
         logging.basicConfig(
             level=getattr(logging, log_level.upper()),
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler(log_file),
+                QueueHandler(log_queue),
                 logging.StreamHandler(sys.stdout) if self.config.get('console_logging', True) else logging.NullHandler()
             ]
         )
@@ -464,28 +960,26 @@ class SchemaMatcher:
             raise FileNotFoundError(f"Directory not found: {directory_path}")
         
         files_structure = {}
-        supported_files = []
         
-        # Find all supported files
-        for ext in self.file_analyzer.supported_extensions:
-            supported_files.extend(directory.rglob(f"*{ext}"))
+        # Find all supported files in a single walk of the tree
+        supported_extensions = self.file_analyzer.supported_extensions
+        supported_files = [path for path in directory.rglob('*') if path.suffix in supported_extensions]
         
         self.logger.info(f"Found {len(supported_files)} files to analyze in {directory_path}")
         
-        for file_path in supported_files:
-            self.logger.info(f"Analyzing: {file_path.name}")
-            
-            if file_path.suffix == '.json':
-                structure = self.file_analyzer.analyze_json_file(file_path)
-            elif file_path.suffix == '.csv':
-                structure = self.file_analyzer.analyze_csv_file(file_path)
-            else:
+        max_workers = self.jobs if self.jobs > 0 else None
+        structures = self.file_analyzer.analyze_many(supported_files, max_workers=max_workers)
+        
+        for file_path, structure in zip(supported_files, structures):
+            if structure is None:
                 continue
             
+            self.logger.info("Analyzed: %s", file_path.name)
+            
             if 'error' not in structure:
                 files_structure[str(file_path)] = structure
             else:
-                self.logger.warning(f"Error analyzing {file_path.name}: {structure['error']}")
+                self.logger.warning("Error analyzing %s: %s", file_path.name, structure['error'])
         
         return files_structure
     
@@ -493,22 +987,66 @@ class SchemaMatcher:
         """Extract schemas from both PostgreSQL and MongoDB"""
         all_schemas = {}
         
-        # PostgreSQL schemas
-        if self.db_extractor.connect_postgres():
-            self.logger.info("Extracting PostgreSQL table schemas...")
+        # Connect to both databases at once so their handshakes (and the
+        # MongoDB server selection timeout when it is down) overlap
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            postgres_future = executor.submit(self.db_extractor.connect_postgres)
+            mongo_future = executor.submit(self.db_extractor.connect_mongo)
+            postgres_connected = postgres_future.result()
+            mongo_connected = mongo_future.result()
+        
+        self.logger.info("Extracting database schemas...")
+        if self.schema_cache:
+            postgres_schemas, mongo_schemas = self.db_extractor.get_cached_schemas()
+        else:
             postgres_schemas = self.db_extractor.get_postgres_tables()
+            mongo_schemas = self.db_extractor.get_mongo_collections()
+        
+        # PostgreSQL schemas
+        if postgres_connected:
             all_schemas.update(postgres_schemas)
             self.logger.info(f"Found {len(postgres_schemas)} PostgreSQL tables")
         
         # MongoDB schemas
-        if self.db_extractor.connect_mongo():
-            self.logger.info("Extracting MongoDB collection schemas...")
-            mongo_schemas = self.db_extractor.get_mongo_collections()
+        if mongo_connected:
             all_schemas.update(mongo_schemas)
             self.logger.info(f"Found {len(mongo_schemas)} MongoDB collections")
         
         return all_schemas
     
+    def match_files(self, files_structure: Dict[str, Dict], schemas: Dict[str, Dict],
+                    top_n: int = 3) -> List[List[Dict]]:
+        """
+        Match every file structure against the schemas, in parallel for larger batches
+        
+        Args:
+            files_structure: File structures by path (from scan_directory)
+            schemas: Database schemas by name
+            top_n: Matches to keep per file
+            
+        Returns:
+            List[List[Dict]]: Matches per file, in the order of files_structure
+        """
+        structures = list(files_structure.values())
+        
+        # Process start-up and shipping the schemas outweigh the matching
+        # itself (about a millisecond per file) unless the batch is large
+        if self.jobs > 0:
+            parallel = self.jobs > 1 and len(structures) >= 4
+        else:
+            parallel = (os.cpu_count() or 1) > 1 and len(structures) >= PARALLEL_MIN_FILES
+        
+        if not parallel:
+            return [self.matcher.match_file_to_schema(structure, schemas, top_n=top_n)
+                    for structure in structures]
+        
+        max_workers = self.jobs if self.jobs > 0 else None
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(structures) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_matching_worker,
+                                 initargs=(self.matcher, schemas, top_n)) as executor:
+            return list(executor.map(_match_in_worker, structures, chunksize=chunksize))
+    
     def run_matching(self, directory_path: str) -> Dict:
         """Run the complete matching process"""
         self.logger.info("Starting Marine Data Schema Matcher")
@@ -534,22 +1072,28 @@ class SchemaMatcher:
             'matches': {}
         }
         
-        for file_path, file_structure in files_structure.items():
-            file_name = Path(file_path).name
-            self.logger.info(f"Matching: {file_name}")
-            matches = self.matcher.match_file_to_schema(file_structure, schemas)
+        all_matches = self.match_files(files_structure, schemas, top_n=3)
+        # Only the JSON report serializes the full file structure
+        keep_file_info = self.output_format in ['json', 'all']
+        
+        for (file_path, file_structure), matches in zip(files_structure.items(), all_matches):
+            file_name = os.path.basename(file_path)
             
-            results['matches'][file_path] = {
-                'file_info': file_structure,
+            entry = {
+                'file_type': file_structure['file_type'],
+                'field_count': len(file_structure.get('fields', ())),
                 'potential_matches': matches[:3]  # Top 3 matches
             }
+            if keep_file_info:
+                entry['file_info'] = file_structure
+            results['matches'][file_path] = entry
             
             if matches:
                 best_match = matches[0]
-                self.logger.info(f"Best match for {file_name}: {best_match['schema_name']} "
-                               f"(score: {best_match['match_score']:.2f})")
+                self.logger.info("Best match for %s: %s (score: %.2f)",
+                                 file_name, best_match['schema_name'], best_match['match_score'])
             else:
-                self.logger.warning(f"No suitable matches found for {file_name}")
+                self.logger.warning("No suitable matches found for %s", file_name)
         
         # Clean up
         self.db_extractor.close_connections()
@@ -567,29 +1111,48 @@ class SchemaMatcher:
     
     def _print_console_report(self, results: Dict):
         """Print detailed console report"""
-        print(f"\n📊 SCHEMA MATCHING REPORT")
-        print("=" * 60)
-        print(f"Timestamp: {results['timestamp']}")
-        print(f"Files Analyzed: {results['files_analyzed']}")
-        print(f"Database Schemas: {results['schemas_found']}")
+        lines = [
+            f"\n📊 SCHEMA MATCHING REPORT",
+            "=" * 60,
+            f"Timestamp: {results['timestamp']}",
+            f"Files Analyzed: {results['files_analyzed']}",
+            f"Database Schemas: {results['schemas_found']}",
+        ]
         
         for file_path, file_info in results['matches'].items():
-            file_name = Path(file_path).name
-            print(f"\n📄 {file_name}")
-            print("-" * 40)
+            lines.append(f"\n📄 {os.path.basename(file_path)}")
+            lines.append("-" * 40)
             
             matches = file_info['potential_matches']
             if matches:
-                print(f"🎯 Top Matches:")
+                lines.append(f"🎯 Top Matches:")
                 for i, match in enumerate(matches[:3], 1):
-                    print(f"  {i}. {match['schema_name']} ({match['schema_type']})")
-                    print(f"     Score: {match['match_score']:.2f}, Coverage: {match['coverage']:.2f}")
+                    lines.append(f"  {i}. {match['schema_name']} ({match['schema_type']})")
+                    lines.append(f"     Score: {match['match_score']:.2f}, Coverage: {match['coverage']:.2f}")
             else:
-                print("❌ No matches found")
+                lines.append("❌ No matches found")
+        
+        # Emit the whole report with a single write instead of one per line
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
     
     def _save_json_report(self, results: Dict):
         """Save detailed JSON report"""
         output_path = Path(self.output_file)
+        
+        if HAS_ORJSON:
+            try:
+                report = orjson.dumps(results, default=_json_report_default,
+                                      option=(orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS |
+                                              orjson.OPT_PASSTHROUGH_DATETIME))
+            except orjson.JSONEncodeError:
+                report = None  # e.g. integers over 64 bits; use the json module
+            if report is not None:
+                with open(output_path, 'wb', buffering=1 << 20) as f:
+                    f.write(report)
+                self.logger.info(f"JSON report saved to: {output_path}")
+                return
+        
         with open(output_path, 'w') as f:
             json.dump(results, f, indent=2, default=str)
         self.logger.info(f"JSON report saved to: {output_path}")
@@ -598,37 +1161,35 @@ class SchemaMatcher:
         """Save CSV summary report"""
         csv_path = Path(self.output_file).with_suffix('.csv')
         
-        rows = []
-        for file_path, file_info in results['matches'].items():
-            file_name = Path(file_path).name
-            file_data = file_info['file_info']
-            
-            if file_info['potential_matches']:
-                for match in file_info['potential_matches']:
-                    rows.append({
-                        'file_name': file_name,
-                        'file_type': file_data['file_type'],
-                        'schema_name': match['schema_name'],
-                        'schema_type': match['schema_type'],
-                        'match_score': round(match['match_score'], 3),
-                        'coverage': round(match['coverage'], 3),
-                        'matched_fields': match['matched_fields']
-                    })
-            else:
-                rows.append({
-                    'file_name': file_name,
-                    'file_type': file_data['file_type'],
-                    'schema_name': 'NO_MATCH',
-                    'schema_type': 'NO_MATCH',
-                    'match_score': 0,
-                    'coverage': 0,
-                    'matched_fields': 0
-                })
+        if not results['matches']:
+            return
+        
+        # Written row by row in one pass; no intermediate dicts or DataFrame
+        with open(csv_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(['file_name', 'file_type', 'schema_name', 'schema_type',
+                             'match_score', 'coverage', 'matched_fields'])
+            
+            for file_path, file_info in results['matches'].items():
+                file_name = os.path.basename(file_path)
+                file_type = file_info['file_type']
+                matches = file_info['potential_matches']
+                
+                if matches:
+                    for match in matches:
+                        writer.writerow((
+                            file_name,
+                            file_type,
+                            match['schema_name'],
+                            match['schema_type'],
+                            round(match['match_score'], 3),
+                            round(match['coverage'], 3),
+                            match['matched_fields']
+                        ))
+                else:
+                    writer.writerow((file_name, file_type, 'NO_MATCH', 'NO_MATCH', 0.0, 0.0, 0))
         
-        if rows:
-            df = pd.DataFrame(rows)
-            df.to_csv(csv_path, index=False)
-            self.logger.info(f"CSV report saved to: {csv_path}")
+        self.logger.info(f"CSV report saved to: {csv_path}")
 
 def main():
     """Main entry point"""
@@ -646,6 +1207,11 @@ def main():
                        help='Log file path')
     parser.add_argument('--no-console-logging', action='store_true',
                        help='Disable console logging (useful for cron jobs)')
+    parser.add_argument('--jobs', type=int, default=-1,
+                       help='Worker processes for file analysis and matching '
+                            '(-1 for one per CPU on large batches only)')
+    parser.add_argument('--no-schema-cache', action='store_true',
+                       help='Always re-extract database schemas instead of using the on-disk cache')
     
     args = parser.parse_args()
     
@@ -655,7 +1221,9 @@ def main():
         'output_file': args.output_file,
         'log_level': args.log_level,
         'log_file': args.log_file,
-        'console_logging': not args.no_console_logging
+        'console_logging': not args.no_console_logging,
+        'jobs': args.jobs,
+        'schema_cache': not args.no_schema_cache
     }
     
     matcher = SchemaMatcher(config)
@@ -8,6 +8,7 @@ import os
 import sys
 import time
 import psycopg2
+from psycopg2.extras import execute_values
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
@@ -141,6 +142,57 @@ def setup_mongodb_schema():
         print(f"❌ Error setting up MongoDB: {e}")
         return False
 
+def sync_taxonomy_cache():
+    """Copy MongoDB taxonomy names into the PostgreSQL taxonomy_cache table"""
+    print("\n🔁 Syncing taxonomy cache...")
+    
+    try:
+        client = MongoClient(
+            host=os.getenv('MONGODB_HOST', 'localhost'),
+            port=int(os.getenv('MONGODB_PORT', '27017'))
+        )
+        db = client[os.getenv('MONGODB_DB', 'marine_db')]
+        
+        # Documents without a species_id cannot be keyed, so they are skipped;
+        # the first document per species wins (one row per upsert batch)
+        species = {}
+        for doc in db.taxonomy_data.find(
+            {'species_id': {'$ne': None}},
+            {'species_id': 1, 'common_name': 1, 'species': 1, 'phylum': 1}
+        ):
+            species.setdefault(doc['species_id'], (
+                doc['species_id'], doc.get('common_name'), doc.get('species'), doc.get('phylum')
+            ))
+        rows = list(species.values())
+        client.close()
+        
+        conn = psycopg2.connect(
+            host=os.getenv('POSTGRES_HOST', 'localhost'),
+            port=os.getenv('POSTGRES_PORT', '5432'),
+            database=os.getenv('POSTGRES_DB', 'marine_db'),
+            user=os.getenv('POSTGRES_USER', 'marineuser'),
+            password=os.getenv('POSTGRES_PASSWORD', 'marinepass123')
+        )
+        
+        with conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO taxonomy_cache (species_id, common_name, scientific_name, phylum)
+                VALUES %s
+                ON CONFLICT (species_id) DO UPDATE SET
+                    common_name = EXCLUDED.common_name,
+                    scientific_name = EXCLUDED.scientific_name,
+                    phylum = EXCLUDED.phylum,
+                    updated_at = CURRENT_TIMESTAMP
+            """, rows, page_size=1000)
+        conn.close()
+        
+        print(f"✅ Synced {len(rows)} species into taxonomy_cache")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error syncing taxonomy cache: {e}")
+        return False
+
 def verify_database_setup():
     """Verify that both databases are properly set up"""
     print("\n🔍 Verifying database setup...")
@@ -294,6 +346,9 @@ def main():
         print("\n❌ Database setup failed. Please check the error messages above.")
         sys.exit(1)
     
+    if not sync_taxonomy_cache():
+        print("⚠️  Taxonomy cache sync failed; integrated queries will show no species names")
+    
     # Verify setup
     verification_success = verify_database_setup()
     